@@ -0,0 +1,24 @@
+-- Migration: Add cardinality_sketches table
+-- Created: 2026-10-18
+-- Purpose: HyperLogLog sketches per (snapshot_date, paper_code, dimension), built from
+--          subscriber_snapshots by `scripts/cardinality_sketches.py --build-stale` and
+--          merged by the same script to answer unique address/phone/route counts
+--          without COUNT(DISTINCT) scans.
+
+CREATE TABLE IF NOT EXISTS cardinality_sketches (
+    id               INT AUTO_INCREMENT PRIMARY KEY,
+    snapshot_date    DATE NOT NULL,
+    paper_code       VARCHAR(10) NOT NULL,
+    dimension        ENUM('address','phone','route') NOT NULL,
+    sketch_precision TINYINT UNSIGNED NOT NULL DEFAULT 12 COMMENT 'log2(register count)',
+    sketch           BLOB NOT NULL COMMENT 'Versioned, zlib-compressed HLL registers',
+    estimated_count  INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Single-paper estimate at import time',
+    updated_at       TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    UNIQUE KEY uq_sketch (snapshot_date, paper_code, dimension),
+    INDEX idx_dimension_date (dimension, snapshot_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+COMMENT='Mergeable HyperLogLog sketches for approximate distinct counts';
+
+-- Rollback (for reference):
+-- DROP TABLE IF EXISTS cardinality_sketches;
@@ -2,15 +2,35 @@
 """
 Circulation Dashboard - Data Import Script
 Imports Newzware CSV exports into MariaDB database
+
+Usage:
+    python3 import_to_database.py                         # single drop in DATA_DIR
+    python3 import_to_database.py --manifest sites.json   # all business units in parallel
+    python3 import_to_database.py --engine sql            # aggregate in MariaDB instead
+    python3 import_to_database.py --engine compare        # benchmark + diff both engines
 """
 
+import argparse
 import csv
+import json
+import os
 import sys
-from collections import defaultdict
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime
 
 import mysql.connector
 
+from partition_manager import maintain_partitions
+from prerender_payloads import prerender
+from sql_engine import (
+    RATE_DISTRIBUTION_TOP,
+    compare_results,
+    print_benchmark,
+    run_sql_engine,
+)
+
 # Database configuration
 DB_CONFIG = {
     "host": "localhost",
@@ -46,11 +66,22 @@ BUSINESS_UNITS = {
     "FN": "Sold",
 }
 
+# Optional subscription export contact columns, used only to pick which
+# duplicate row survives. The standard export (sp_num, sp_stat, sp_rate_id,
+# sp_route, sp_vac_ind) has none of them, so there every row scores 0 and the
+# later duplicate wins; they only count if a site adds them to its template.
+# (first non-empty column wins; export templates differ between sites)
+CONTACT_COLUMNS = {
+    "phone": ("sp_phone", "ad_phone", "Phone"),
+    "email": ("sp_email", "ad_email", "Email"),
+    "address": ("sp_address", "ad_address1", "Address"),
+}
 
-def connect_db():
-    """Connect to MariaDB database"""
+
+def connect_db(**options):
+    """Connect to MariaDB database (options are passed through to the connector)"""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = mysql.connector.connect(**DB_CONFIG, **options)
         print("✅ Connected to database")
         return conn
     except mysql.connector.Error as err:
@@ -58,12 +89,12 @@ def connect_db():
         sys.exit(1)
 
 
-def load_rates(cursor):
+def load_rates(rates_file=RATES_FILE):
     """Load rate-to-edition mapping from CSV"""
-    print(f"\n📖 Loading rates from {RATES_FILE}...")
+    print(f"\n📖 Loading rates from {rates_file}...")
     rate_map = {}
 
-    with open(RATES_FILE, "r") as f:
+    with open(rates_file, "r") as f:
         reader = csv.DictReader(f)
         for row in reader:
             # Map rate ID to edition
@@ -79,13 +110,13 @@ def load_rates(cursor):
     return rate_map
 
 
-def load_vacations(cursor):
+def load_vacations(vacations_file=VACATIONS_FILE, today=None):
     """Load vacation holds from CSV"""
-    print(f"\n📖 Loading vacations from {VACATIONS_FILE}...")
+    print(f"\n📖 Loading vacations from {vacations_file}...")
     vacation_map = defaultdict(list)
-    today = date.today()
+    today = today or date.today()
 
-    with open(VACATIONS_FILE, "r") as f:
+    with open(vacations_file, "r") as f:
         reader = csv.DictReader(f)
         for row in reader:
             vac_id = row["vd_sp_id"].strip()
@@ -117,11 +148,35 @@ def load_vacations(cursor):
     return vacation_map
 
 
-def process_subscriptions(cursor, rate_map, vacation_map):
-    """Process subscriptions and insert into database"""
-    print(f"\n📖 Loading subscriptions from {SUBSCRIPTIONS_FILE}...")
+def first_value(row, columns):
+    """First non-empty value among candidate columns, stripped, or None"""
+    return next((row[c].strip() for c in columns if row.get(c) and row[c].strip()), None)
+
+
+def parse_subscriptions(
+    rate_map, vacation_map, subscriptions_file=SUBSCRIPTIONS_FILE, paper_names=PAPER_NAMES
+):
+    """
+    Aggregate active subscriptions by edition (no database access)
+
+    Rows are first collected into a hash index on (sub_num, paper_code) so a
+    subscriber listed more than once is only counted once. The same rule as
+    sql/06_fix_duplicate_subscribers.sql decides which row survives: the one
+    with the most complete contact info (phone, email, address), and the
+    later row when they are equally complete. The standard export carries no
+    contact columns (see CONTACT_COLUMNS), so in practice the later row wins
+    here; the contact rule only applies to templates that include them.
+    Each paper's stats include duplicates_resolved and top_rates:
+    (rate_id, description, count) for the top RATE_DISTRIBUTION_TOP rates,
+    most subscribers first, then by rate id.
+
+    Returns stats_by_paper as a plain dict so results can be handed back
+    from a worker process. Cardinality sketches are not built here: this
+    export has no addresses or phones, so they come from subscriber_snapshots
+    (see cardinality_sketches.py).
+    """
+    print(f"\n📖 Loading subscriptions from {subscriptions_file}...")
 
-    snapshot_date = date.today()
     stats_by_paper = defaultdict(
         lambda: {
             "total_active": 0,
@@ -130,10 +185,16 @@ def process_subscriptions(cursor, rate_map, vacation_map):
             "mail_delivery": 0,
             "carrier_delivery": 0,
             "digital_only": 0,
+            "duplicates_resolved": 0,
         }
     )
 
-    with open(SUBSCRIPTIONS_FILE, "r") as f:
+    rate_counts = defaultdict(Counter)
+
+    # (sub_num, paper_code) -> surviving subscriber record
+    subscribers = {}
+
+    with open(subscriptions_file, "r") as f:
         reader = csv.DictReader(f)
         for row in reader:
             sp_num = row["sp_num"].strip()
@@ -153,7 +214,7 @@ def process_subscriptions(cursor, rate_map, vacation_map):
             edition = rate_map[sp_rate_id]["edition"]
 
             # Skip if not a known paper
-            if edition not in PAPER_NAMES:
+            if edition not in paper_names:
                 continue
 
             # Determine delivery type
@@ -173,26 +234,72 @@ def process_subscriptions(cursor, rate_map, vacation_map):
                         is_on_vacation = True
                         break
 
-            # Update stats
-            stats_by_paper[edition]["total_active"] += 1
-            if is_on_vacation:
-                stats_by_paper[edition]["on_vacation"] += 1
-            else:
-                stats_by_paper[edition]["deliverable"] += 1
-
-            if delivery_type == "mail":
-                stats_by_paper[edition]["mail_delivery"] += 1
-            elif delivery_type == "carrier":
-                stats_by_paper[edition]["carrier_delivery"] += 1
-            elif delivery_type == "digital":
-                stats_by_paper[edition]["digital_only"] += 1
-
-    # Insert into database
+            record = {
+                "edition": edition,
+                "rate_id": sp_rate_id,
+                "delivery_type": delivery_type,
+                "is_on_vacation": is_on_vacation,
+                "completeness": sum(
+                    1 for columns in CONTACT_COLUMNS.values() if first_value(row, columns)
+                ),
+            }
+
+            # Resolve duplicates: most complete contact info wins, ties go to the later row
+            key = (sp_num, edition)
+            existing = subscribers.get(key)
+            if existing is not None:
+                stats_by_paper[edition]["duplicates_resolved"] += 1
+                if existing["completeness"] > record["completeness"]:
+                    continue
+            subscribers[key] = record
+
+    for record in subscribers.values():
+        edition = record["edition"]
+        delivery_type = record["delivery_type"]
+
+        # Update stats
+        stats_by_paper[edition]["total_active"] += 1
+        if record["is_on_vacation"]:
+            stats_by_paper[edition]["on_vacation"] += 1
+        else:
+            stats_by_paper[edition]["deliverable"] += 1
+
+        if delivery_type == "mail":
+            stats_by_paper[edition]["mail_delivery"] += 1
+        elif delivery_type == "carrier":
+            stats_by_paper[edition]["carrier_delivery"] += 1
+        elif delivery_type == "digital":
+            stats_by_paper[edition]["digital_only"] += 1
+
+        rate_counts[edition][record["rate_id"]] += 1
+
+    for edition, counts in rate_counts.items():
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        stats_by_paper[edition]["top_rates"] = [
+            (rate_id, rate_map[rate_id]["description"], count)
+            for rate_id, count in ranked[:RATE_DISTRIBUTION_TOP]
+        ]
+
+    duplicates = sum(stats["duplicates_resolved"] for stats in stats_by_paper.values())
+    if duplicates:
+        print(f"   Resolved {duplicates} duplicate subscriber rows")
+
+    return dict(stats_by_paper)
+
+
+def save_snapshots(
+    cursor,
+    snapshot_date,
+    stats_by_paper,
+    paper_names=PAPER_NAMES,
+    business_units=BUSINESS_UNITS,
+):
+    """Insert per-paper snapshots and top rates"""
     print(f"\n💾 Inserting data into database...")
 
     for edition, stats in stats_by_paper.items():
-        paper_name = PAPER_NAMES[edition]
-        business_unit = BUSINESS_UNITS[edition]
+        paper_name = paper_names[edition]
+        business_unit = business_units[edition]
 
         cursor.execute(
             """
@@ -223,13 +330,58 @@ def process_subscriptions(cursor, rate_map, vacation_map):
             ),
         )
 
+        # rate_distribution has no unique key - replace this date's rows for the paper
+        cursor.execute(
+            "DELETE FROM rate_distribution WHERE snapshot_date = %s AND paper_code = %s",
+            (snapshot_date, edition),
+        )
+        total_active = stats["total_active"]
+        cursor.executemany(
+            """
+            INSERT INTO rate_distribution
+            (snapshot_date, paper_code, rate_id, rate_description,
+             subscriber_count, percentage, rank_position)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """,
+            [
+                (
+                    snapshot_date,
+                    edition,
+                    rate_id,
+                    description,
+                    count,
+                    round(count / total_active * 100, 2) if total_active else 0,
+                    rank,
+                )
+                for rank, (rate_id, description, count) in enumerate(stats.get("top_rates", []), 1)
+            ],
+        )
+
     print(f"   Inserted {len(stats_by_paper)} paper snapshots")
+
+
+def process_subscriptions(cursor, rate_map, vacation_map, snapshot_date=None):
+    """Process subscriptions and insert into database"""
+    snapshot_date = snapshot_date or date.today()
+    stats_by_paper = parse_subscriptions(rate_map, vacation_map)
+    save_snapshots(cursor, snapshot_date, stats_by_paper)
     return stats_by_paper
 
 
-def log_import(cursor, stats_by_paper):
-    """Log import to import_log table"""
+def log_import(cursor, stats_by_paper, site_name=None):
+    """Log import to import_log table, returning the new import_log id"""
     total_records = sum(stats["total_active"] for stats in stats_by_paper.values())
+    duplicates = sum(stats.get("duplicates_resolved", 0) for stats in stats_by_paper.values())
+    notes = f"Imported {len(stats_by_paper)} papers"
+    if site_name:
+        notes += f" ({site_name})"
+    if duplicates:
+        by_paper = ", ".join(
+            f"{edition}: {stats['duplicates_resolved']}"
+            for edition, stats in sorted(stats_by_paper.items())
+            if stats.get("duplicates_resolved")
+        )
+        notes += f"; resolved {duplicates} duplicate subscribers ({by_paper})"
 
     cursor.execute(
         """
@@ -240,36 +392,249 @@ def log_import(cursor, stats_by_paper):
             datetime.now(),
             total_records,
             "success",
-            f"Imported {len(stats_by_paper)} papers",
+            notes,
         ),
     )
 
     print(f"\n✅ Import logged: {total_records} total subscriptions")
+    return cursor.lastrowid
+
+
+def import_files():
+    """Export file paths for the single-drop import, as used by the SQL engine"""
+    return {"subscriptions": SUBSCRIPTIONS_FILE, "vacations": VACATIONS_FILE, "rates": RATES_FILE}
+
+
+def compare_engines(cursor, snapshot_date):
+    """
+    Run the Python and SQL engines on the same exports and diff the results
+
+    Nothing is written: the SQL engine stops at its staging tables. Returns
+    True when both engines produce identical per-paper stats.
+    """
+    started = time.perf_counter()
+    rate_map = load_rates()
+    vacation_map = load_vacations(today=snapshot_date)
+    python_stats = parse_subscriptions(rate_map, vacation_map)
+    python_seconds = time.perf_counter() - started
+
+    sql_stats, sql_seconds = run_sql_engine(
+        cursor,
+        snapshot_date,
+        import_files(),
+        PAPER_NAMES,
+        BUSINESS_UNITS,
+        CONTACT_COLUMNS,
+        write=False,
+    )
+
+    differences = compare_results(python_stats, sql_stats)
+    print_benchmark(python_seconds, sql_seconds, differences)
+    return not differences
+
+
+def load_manifest(manifest_file):
+    """
+    Load a batch manifest describing one Newzware export drop per site
+
+    Format (see import_sites.example.json):
+        {"sites": [{"name": "Wyoming", "data_dir": "/volume1/circulation/data/wy",
+                    "editions": {"TR": "The Register", ...}}, ...]}
+
+    Each site's business unit defaults to its name; "business_unit" overrides it.
+    Paper codes must be unique across sites - each site owns its snapshot scope.
+    """
+    with open(manifest_file, "r") as f:
+        manifest = json.load(f)
+
+    sites = manifest.get("sites") or []
+    if not sites:
+        raise ValueError(f"No sites defined in {manifest_file}")
+
+    seen_codes = {}
+    for site in sites:
+        for key in ("name", "data_dir", "editions"):
+            if not site.get(key):
+                raise ValueError(f"Manifest site is missing '{key}': {site}")
+        if not os.path.isdir(site["data_dir"]):
+            raise ValueError(f"Data directory not found for {site['name']}: {site['data_dir']}")
+        site.setdefault("business_unit", site["name"])
+
+        for code in site["editions"]:
+            if code in seen_codes:
+                raise ValueError(
+                    f"Paper code {code} appears in both {seen_codes[code]} and {site['name']}"
+                )
+            seen_codes[code] = site["name"]
+
+    return sites
+
+
+def import_site(site, snapshot_date):
+    """
+    Parse one site's export drop (runs in a worker process)
+
+    Reads rates, vacations and subscriptions from the site's data_dir and
+    returns its aggregated results; all database writes happen in the parent.
+    """
+    data_dir = site["data_dir"]
+    rate_map = load_rates(os.path.join(data_dir, "rates_latest.csv"))
+    vacation_map = load_vacations(os.path.join(data_dir, "vacations_latest.csv"), snapshot_date)
+    stats_by_paper = parse_subscriptions(
+        rate_map,
+        vacation_map,
+        os.path.join(data_dir, "subscriptions_latest.csv"),
+        site["editions"],
+    )
+    return site, stats_by_paper
+
+
+def run_batch(manifest_file):
+    """
+    Import every site in a manifest concurrently, then commit once
+
+    Sites are parsed in a process pool, so wall time is roughly that of the
+    largest drop. Results are written in a single transaction: if any site
+    fails, nothing is committed.
+    """
+    snapshot_date = date.today()
+
+    try:
+        sites = load_manifest(manifest_file)
+
+        print(f"\n🚀 Parsing {len(sites)} sites in parallel...")
+        with ProcessPoolExecutor(max_workers=len(sites)) as pool:
+            results = list(pool.map(import_site, sites, [snapshot_date] * len(sites)))
+    except Exception as e:
+        # Nothing has touched the database yet
+        print(f"\n❌ Batch import failed, no sites committed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
+
+    conn = connect_db()
+    cursor = conn.cursor()
+
+    try:
+        try:
+            all_stats = {}
+            for site, stats_by_paper in results:
+                print(f"\n🏢 {site['name']}")
+                save_snapshots(
+                    cursor,
+                    snapshot_date,
+                    stats_by_paper,
+                    site["editions"],
+                    {code: site["business_unit"] for code in site["editions"]},
+                )
+                import_id = log_import(cursor, stats_by_paper, site["name"])
+                all_stats.update(stats_by_paper)
+
+            # One coordinated commit for all sites
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"\n❌ Batch import failed, no sites committed: {e}")
+            import traceback
+
+            traceback.print_exc()
+            sys.exit(1)
+
+        # Everything below runs on committed data; failures here are not rollbacks
+        # Keep upcoming subscriber_snapshots partitions ahead of the data
+        maintain_partitions(cursor)
+
+        # Warm the dashboard from the committed data
+        prerender(cursor, snapshot_date, import_id)
+    finally:
+        cursor.close()
+        conn.close()
+
+    print("\n" + "=" * 60)
+    print("📊 BATCH IMPORT SUMMARY")
+    print("=" * 60)
+    for site, stats_by_paper in results:
+        for edition in sorted(stats_by_paper.keys()):
+            stats = stats_by_paper[edition]
+            print(
+                f"{site['business_unit']:15s} {edition:4s} | "
+                + f"Active: {stats['total_active']:5d} | "
+                + f"Vacation: {stats['on_vacation']:3d} | "
+                + f"Deliverable: {stats['deliverable']:5d}"
+            )
+    print("=" * 60)
+    print(f"\n✅ Batch import completed: {len(sites)} sites, {len(all_stats)} papers")
 
 
 def main():
     """Main import process"""
+    parser = argparse.ArgumentParser(description="Import Newzware exports into MariaDB")
+    parser.add_argument(
+        "--manifest", help="JSON manifest of per-site data directories (batch mode)"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("python", "sql", "compare"),
+        default="python",
+        help="Aggregate in Python (default), in MariaDB, or run both and compare",
+    )
+    args = parser.parse_args()
+    if args.manifest and args.engine != "python":
+        parser.error("--engine sql/compare only applies to single-drop imports, not --manifest")
+
+    if args.manifest:
+        print("=" * 60)
+        print("Circulation Dashboard - Batch Data Import")
+        print("=" * 60)
+        run_batch(args.manifest)
+        return
+
     print("=" * 60)
     print("Circulation Dashboard - Data Import")
     print("=" * 60)
 
-    conn = connect_db()
+    # The SQL engine bulk-loads the exports with LOAD DATA LOCAL INFILE
+    conn = connect_db(allow_local_infile=args.engine != "python")
     cursor = conn.cursor()
 
+    if args.engine == "compare":
+        try:
+            identical = compare_engines(cursor, date.today())
+        finally:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+        sys.exit(0 if identical else 1)
+
     try:
-        # Load reference data
-        rate_map = load_rates(cursor)
-        vacation_map = load_vacations(cursor)
+        snapshot_date = date.today()
 
-        # Process subscriptions
-        stats_by_paper = process_subscriptions(cursor, rate_map, vacation_map)
+        if args.engine == "sql":
+            stats_by_paper, seconds = run_sql_engine(
+                cursor, snapshot_date, import_files(), PAPER_NAMES, BUSINESS_UNITS, CONTACT_COLUMNS
+            )
+            print(f"   SQL engine finished in {seconds:.2f}s")
+        else:
+            # Load reference data
+            rate_map = load_rates()
+            vacation_map = load_vacations(today=snapshot_date)
+
+            # Process subscriptions
+            stats_by_paper = process_subscriptions(cursor, rate_map, vacation_map, snapshot_date)
 
         # Log the import
-        log_import(cursor, stats_by_paper)
+        import_id = log_import(cursor, stats_by_paper)
 
         # Commit transaction
         conn.commit()
 
+        # Keep upcoming subscriber_snapshots partitions ahead of the data
+        maintain_partitions(cursor)
+
+        # Warm the dashboard from the committed data
+        prerender(cursor, snapshot_date, import_id)
+
         # Print summary
         print("\n" + "=" * 60)
         print("📊 IMPORT SUMMARY")
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Circulation Dashboard - Partition Manager
+Keeps subscriber_snapshots' monthly RANGE partitions rolling forward
+
+sql/06_partition_subscriber_snapshots.sql creates monthly partitions named
+pYYYY_MM plus a p_future catch-all. Once the named months run out, new rows
+land in p_future and date-range queries stop pruning. This module:
+
+- splits upcoming months out of p_future ahead of time (REORGANIZE PARTITION)
+- reports per-partition row counts and sizes
+- applies a retention policy to expired months, either
+    archive: swap the partition into a compressed archive table
+             (EXCHANGE PARTITION, no row copying) and drop it, or
+    export:  write its rows to a gzip CSV and drop it
+
+Upcoming partitions are added by run-auto-process.sh (--ensure) before each
+daily upload, since the PHP AllSubscriberImporter is what writes
+subscriber_snapshots; import_to_database.py also checks them after its
+commit. Retention runs only when asked for on the command line.
+
+Usage:
+    python3 partition_manager.py --report
+    python3 partition_manager.py --ensure 3
+    python3 partition_manager.py --retention-months 24 --mode archive
+    python3 partition_manager.py --retention-months 24 --mode export --export-dir /volume1/backups
+"""
+
+import argparse
+import csv
+import gzip
+import os
+import re
+import sys
+from datetime import date
+
+TABLE = "subscriber_snapshots"
+FUTURE_PARTITION = "p_future"
+MONTHS_AHEAD = 3
+
+_MONTHLY_PARTITION = re.compile(r"^p(\d{4})_(\d{2})$")
+
+
+def _add_months(year, month, months):
+    """Return (year, month) shifted by a number of months"""
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def partition_name(year, month):
+    """Partition name for a month, e.g. p2027_01"""
+    return f"p{year:04d}_{month:02d}"
+
+
+def list_partitions(cursor, table=TABLE):
+    """
+    Per-partition stats in partition order
+
+    Returns a list of dicts: name, rows, data_bytes, index_bytes, description.
+    Row counts come from InnoDB statistics and are estimates.
+    """
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = %s
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """,
+        (table,),
+    )
+    return [
+        {
+            "name": name,
+            "rows": int(rows or 0),
+            "data_bytes": int(data_bytes or 0),
+            "index_bytes": int(index_bytes or 0),
+            "description": description,
+        }
+        for name, rows, data_bytes, index_bytes, description in cursor.fetchall()
+    ]
+
+
+def monthly_partitions(partitions):
+    """{(year, month): partition} for pYYYY_MM partitions"""
+    months = {}
+    for partition in partitions:
+        match = _MONTHLY_PARTITION.match(partition["name"])
+        if match:
+            months[(int(match.group(1)), int(match.group(2)))] = partition
+    return months
+
+
+def months_to_create(existing_months, months_ahead=MONTHS_AHEAD, today=None):
+    """
+    (year, month) pairs to add so partitions run through today + months_ahead
+
+    Starts after the latest existing month, or at today's month when there
+    are none, so the sequence never leaves gaps.
+    """
+    today = today or date.today()
+    target = _add_months(today.year, today.month, months_ahead)
+    next_month = (
+        _add_months(*max(existing_months), 1) if existing_months else (today.year, today.month)
+    )
+
+    new_months = []
+    while next_month <= target:
+        new_months.append(next_month)
+        next_month = _add_months(*next_month, 1)
+    return new_months
+
+
+def ensure_future_partitions(cursor, months_ahead=MONTHS_AHEAD, today=None, table=TABLE):
+    """
+    Split monthly partitions out of p_future through today + months_ahead
+
+    New months start after the latest existing pYYYY_MM partition, so there
+    are never gaps. Returns the list of partition names created.
+    """
+    partitions = list_partitions(cursor, table)
+    names = {p["name"] for p in partitions}
+    if FUTURE_PARTITION not in names:
+        print(f"   {table} has no {FUTURE_PARTITION} partition - skipping partition maintenance")
+        return []
+
+    new_months = months_to_create(monthly_partitions(partitions), months_ahead, today)
+    if not new_months:
+        return []
+
+    definitions = []
+    for year, month in new_months:
+        upper_year, upper_month = _add_months(year, month, 1)
+        definitions.append(
+            f"PARTITION {partition_name(year, month)} VALUES LESS THAN "
+            f"(TO_DAYS('{upper_year:04d}-{upper_month:02d}-01')) "
+            f"COMMENT '{date(year, month, 1).strftime('%B %Y')}'"
+        )
+    definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+
+    cursor.execute(
+        f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO "
+        f"({', '.join(definitions)})"
+    )
+
+    created = [partition_name(year, month) for year, month in new_months]
+    print(f"   Created partitions: {', '.join(created)}")
+    return created
+
+
+def expired_months(partitions, retention_months, today=None):
+    """Monthly partitions that ended more than retention_months ago, oldest first"""
+    today = today or date.today()
+    cutoff = _add_months(today.year, today.month, -retention_months)
+    return [
+        (month, partition)
+        for month, partition in sorted(monthly_partitions(partitions).items())
+        if month < cutoff
+    ]
+
+
+def archive_partition(cursor, name, table=TABLE):
+    """
+    Move a partition into a compressed archive table, then drop the partition
+
+    EXCHANGE PARTITION swaps tablespaces, so no rows are copied; the archive
+    table is rebuilt compressed afterwards, outside the live table.
+
+    Each DDL statement commits on its own, so every step checks what an
+    earlier, interrupted run already did and the whole call can be rerun.
+    """
+    archive_table = f"{table}_archive_{name[1:]}"
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {archive_table} LIKE {table}")
+
+    cursor.execute(
+        """
+        SELECT COUNT(*)
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = %s
+          AND PARTITION_NAME IS NOT NULL
+    """,
+        (archive_table,),
+    )
+    if cursor.fetchone()[0]:
+        cursor.execute(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+
+    cursor.execute(f"SELECT 1 FROM {table} PARTITION ({name}) LIMIT 1")
+    partition_has_rows = cursor.fetchone() is not None
+    cursor.execute(f"SELECT 1 FROM {archive_table} LIMIT 1")
+    archive_has_rows = cursor.fetchone() is not None
+
+    if partition_has_rows and archive_has_rows:
+        # Exchanging now would swap the archived rows back into the live table
+        raise RuntimeError(
+            f"both {table} partition {name} and {archive_table} contain rows - "
+            "resolve manually before archiving"
+        )
+    if partition_has_rows:
+        cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {name} WITH TABLE {archive_table}")
+
+    cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+    cursor.execute(f"ALTER TABLE {archive_table} ROW_FORMAT=COMPRESSED")
+    return archive_table
+
+
+def export_partition(cursor, name, export_dir, table=TABLE):
+    """Write a partition's rows to <export_dir>/<table>_<name>.csv.gz, then drop it"""
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f"{table}_{name}.csv.gz")
+    tmp_path = path + ".tmp"
+
+    cursor.execute(f"SELECT * FROM {table} PARTITION ({name})")
+    columns = [column[0] for column in cursor.description]
+    rows = 0
+    with gzip.open(tmp_path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        while True:
+            batch = cursor.fetchmany(10000)
+            if not batch:
+                break
+            writer.writerows(batch)
+            rows += len(batch)
+
+    # Only drop once the export is complete on disk
+    os.replace(tmp_path, path)
+    cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+    return path, rows
+
+
+def apply_retention(cursor, retention_months, mode="archive", export_dir=None, table=TABLE):
+    """Archive or export-and-drop every partition older than the retention window"""
+    if mode not in ("archive", "export"):
+        raise ValueError(f"unknown retention mode '{mode}', expected 'archive' or 'export'")
+    if mode == "export" and not export_dir:
+        raise ValueError("export mode requires an export directory")
+    if retention_months < 1:
+        raise ValueError("retention must keep at least the current month")
+
+    expired = expired_months(list_partitions(cursor, table), retention_months)
+    if not expired:
+        print(f"   No partitions older than {retention_months} months")
+        return []
+
+    handled = []
+    for _, partition in expired:
+        name = partition["name"]
+        if mode == "archive":
+            archive_table = archive_partition(cursor, name, table)
+            print(f"   📦 {name}: archived to {archive_table}")
+        else:
+            path, rows = export_partition(cursor, name, export_dir, table)
+            print(f"   📤 {name}: exported {rows:,} rows to {path}")
+        handled.append(name)
+    return handled
+
+
+def print_report(partitions):
+    """Print per-partition row counts and sizes"""
+    print(f"\n{'Partition':12s} {'Rows (est.)':>12s} {'Data MB':>9s} {'Index MB':>9s}")
+    print("-" * 45)
+    for p in partitions:
+        print(
+            f"{p['name']:12s} {p['rows']:12,d} "
+            + f"{p['data_bytes'] / 1024 / 1024:9.2f} "
+            + f"{p['index_bytes'] / 1024 / 1024:9.2f}"
+        )
+
+    future = next((p for p in partitions if p["name"] == FUTURE_PARTITION), None)
+    if future and future["rows"]:
+        print(
+            f"\n⚠️  {future['rows']:,} rows in {FUTURE_PARTITION} - run --ensure to split them out"
+        )
+
+
+def maintain_partitions(cursor, months_ahead=MONTHS_AHEAD):
+    """
+    Import-pipeline hook: add upcoming partitions and warn about p_future
+
+    Runs after the import commit (partition DDL commits implicitly). Problems
+    are reported but never fail the import.
+    """
+    print(f"\n🗂️  Checking {TABLE} partitions...")
+    try:
+        ensure_future_partitions(cursor, months_ahead)
+        partitions = list_partitions(cursor)
+    except Exception as e:
+        print(f"   ⚠️  Partition maintenance failed: {e}")
+        return None
+
+    future = next((p for p in partitions if p["name"] == FUTURE_PARTITION), None)
+    if future and future["rows"]:
+        print(f"   ⚠️  {future['rows']:,} rows (est.) in {FUTURE_PARTITION}")
+    return partitions
+
+
+def main():
+    """Command-line partition maintenance"""
+    parser = argparse.ArgumentParser(description=f"Manage {TABLE} monthly partitions")
+    parser.add_argument("--report", action="store_true", help="Show per-partition stats")
+    parser.add_argument(
+        "--ensure", type=int, metavar="MONTHS", help="Create partitions this many months ahead"
+    )
+    parser.add_argument("--retention-months", type=int, help="Keep this many months live")
+    parser.add_argument("--mode", choices=("archive", "export"), default="archive")
+    parser.add_argument("--export-dir", help="Directory for --mode export files")
+    args = parser.parse_args()
+
+    # Imported here so the partition code has no hard dependency on the importer
+    from import_to_database import connect_db
+
+    conn = connect_db()
+    cursor = conn.cursor()
+    try:
+        if args.ensure is not None:
+            ensure_future_partitions(cursor, args.ensure)
+        if args.retention_months is not None:
+            apply_retention(cursor, args.retention_months, args.mode, args.export_dir)
+        if args.report or (args.ensure is None and args.retention_months is None):
+            print_report(list_partitions(cursor))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Circulation Dashboard - Payload Pre-rendering
+Builds the standard dashboard payloads right after an import commits
+
+Payloads are written as gzip-compressed JSON under PAYLOAD_DIR:
+
+    <PAYLOAD_DIR>/<snapshot_date>/overview.v1.json.gz
+    <PAYLOAD_DIR>/<snapshot_date>/business_unit_trends.v1.json.gz
+    <PAYLOAD_DIR>/<snapshot_date>/paper_cards.v1.json.gz
+    <PAYLOAD_DIR>/manifest.json      (latest snapshot, import_id, file list)
+
+Every file is written to a temp file and renamed into place, so readers never
+see a partial payload. Invalidation goes through import_log: the manifest
+records the import_log id the payloads were built from, and is_fresh() treats
+them as stale whenever MAX(import_log.id) has moved past it. Every import path
+logs there - this importer, and on the PHP side AllSubscriberImporter,
+VacationImporter and upload_vacations.php. The web tier serves the files
+through web/lib/PayloadReader.php (api.php?action=payload), which mirrors
+read_payload(). Bump PAYLOAD_VERSION whenever a payload shape changes; old
+files are then ignored.
+
+import_to_database.py pre-renders right after its commit; run-auto-process.sh
+runs this script after each PHP upload to rebuild stale payloads.
+
+Only the latest KEEP_SNAPSHOTS snapshot directories are kept; older ones are
+pruned after each successful pre-render.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+PAYLOAD_VERSION = 1
+PAYLOAD_DIR = "/volume1/circulation/cache/payloads"
+KEEP_SNAPSHOTS = 8
+
+_SNAPSHOT_DIR = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Matches getAllBusinessUnitTrends() in web/api/legacy.php
+TREND_BUSINESS_UNITS = ["South Carolina", "Wyoming", "Michigan"]
+TREND_WEEKS = 13
+
+# Sold papers are excluded from every dashboard total
+EXCLUDED_PAPERS = ("FN",)
+
+STAT_COLUMNS = (
+    "total_active",
+    "on_vacation",
+    "deliverable",
+    "mail_delivery",
+    "carrier_delivery",
+    "digital_only",
+)
+
+
+def build_paper_cards(cursor, snapshot_date):
+    """Per-paper stats for the snapshot date"""
+    cursor.execute(
+        f"""
+        SELECT paper_code, paper_name, business_unit, {", ".join(STAT_COLUMNS)}
+        FROM daily_snapshots
+        WHERE snapshot_date = %s
+          AND paper_code NOT IN ({", ".join(["%s"] * len(EXCLUDED_PAPERS))})
+        ORDER BY business_unit, paper_code
+    """,
+        (snapshot_date, *EXCLUDED_PAPERS),
+    )
+
+    cards = []
+    for row in cursor.fetchall():
+        paper_code, paper_name, business_unit = row[:3]
+        card = {"paper_code": paper_code, "paper_name": paper_name, "business_unit": business_unit}
+        card.update({column: int(value or 0) for column, value in zip(STAT_COLUMNS, row[3:])})
+        cards.append(card)
+    return cards
+
+
+def build_overview(paper_cards):
+    """Overall and per-business-unit totals, derived from the paper cards"""
+    totals = {column: 0 for column in STAT_COLUMNS}
+    by_business_unit = defaultdict(lambda: {column: 0 for column in STAT_COLUMNS})
+
+    for card in paper_cards:
+        for column in STAT_COLUMNS:
+            totals[column] += card[column]
+            by_business_unit[card["business_unit"]][column] += card[column]
+
+    return {"totals": totals, "by_business_unit": dict(by_business_unit)}
+
+
+def build_business_unit_trends(cursor, snapshot_date):
+    """
+    13-week paid-circulation series per business unit
+
+    Same shape as getBusinessUnitTrendData(): W1..W13 ending with the
+    snapshot's ISO week, latest snapshot in each week wins, comps excluded.
+    """
+    start_date = snapshot_date - timedelta(weeks=TREND_WEEKS, days=7)
+    cursor.execute(
+        f"""
+        SELECT snapshot_date, business_unit,
+               SUM(total_active), SUM(COALESCE(comp_count, 0))
+        FROM daily_snapshots
+        WHERE snapshot_date BETWEEN %s AND %s
+          AND paper_code NOT IN ({", ".join(["%s"] * len(EXCLUDED_PAPERS))})
+        GROUP BY snapshot_date, business_unit
+        ORDER BY snapshot_date
+    """,
+        (start_date, snapshot_date, *EXCLUDED_PAPERS),
+    )
+
+    # Ordered by date, so later snapshots in the same ISO week overwrite earlier ones
+    by_week = defaultdict(dict)
+    for day, business_unit, total_active, comp_count in cursor.fetchall():
+        by_week[business_unit][day.isocalendar()[:2]] = (int(total_active), int(comp_count))
+
+    weeks = [
+        (snapshot_date - timedelta(weeks=TREND_WEEKS - 1 - i)).isocalendar()[:2]
+        for i in range(TREND_WEEKS)
+    ]
+
+    trends = {}
+    for business_unit in TREND_BUSINESS_UNITS:
+        series = []
+        last_value = None
+        for i, week in enumerate(weeks):
+            point = {"label": f"W{i + 1}", "total_active": None, "comp_count": None, "change": None}
+            if week in by_week[business_unit]:
+                total_active, comp_count = by_week[business_unit][week]
+                paid_active = total_active - comp_count
+                point["total_active"] = paid_active
+                point["comp_count"] = comp_count
+                point["change"] = paid_active - last_value if last_value is not None else None
+                last_value = paid_active
+            series.append(point)
+        trends[business_unit] = series
+    return trends
+
+
+def build_payloads(cursor, snapshot_date):
+    """Build every standard payload for a snapshot date"""
+    paper_cards = build_paper_cards(cursor, snapshot_date)
+    return {
+        "overview": build_overview(paper_cards),
+        "business_unit_trends": build_business_unit_trends(cursor, snapshot_date),
+        "paper_cards": paper_cards,
+    }
+
+
+def _atomic_write(path, data):
+    """Write bytes to path via temp file + rename in the same directory"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_payloads(payloads, snapshot_date, import_id, payload_dir=PAYLOAD_DIR):
+    """
+    Write payloads for one snapshot date, then publish the manifest
+
+    The manifest is written last so it only ever points at complete files.
+    Returns the manifest dict.
+    """
+    snapshot_key = snapshot_date.isoformat()
+    snapshot_dir = os.path.join(payload_dir, snapshot_key)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    generated_at = datetime.now().isoformat(timespec="seconds")
+    files = {}
+    for name, data in payloads.items():
+        filename = f"{name}.v{PAYLOAD_VERSION}.json.gz"
+        document = {
+            "version": PAYLOAD_VERSION,
+            "snapshot_date": snapshot_key,
+            "import_id": import_id,
+            "generated_at": generated_at,
+            "data": data,
+        }
+        encoded = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        # mtime=0 keeps output byte-identical for identical payloads
+        _atomic_write(os.path.join(snapshot_dir, filename), gzip.compress(encoded, mtime=0))
+        files[name] = f"{snapshot_key}/{filename}"
+
+    manifest = {
+        "version": PAYLOAD_VERSION,
+        "snapshot_date": snapshot_key,
+        "import_id": import_id,
+        "generated_at": generated_at,
+        "files": files,
+    }
+    _atomic_write(
+        os.path.join(payload_dir, "manifest.json"),
+        json.dumps(manifest, indent=2).encode("utf-8"),
+    )
+    return manifest
+
+
+def load_manifest(payload_dir=PAYLOAD_DIR):
+    """Current manifest dict, or None if it is missing or unreadable"""
+    try:
+        with open(os.path.join(payload_dir, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(manifest, cursor):
+    """
+    True if the manifest was built from the latest import
+
+    Stale when the payload version changed or any import has been logged
+    since the payloads were written.
+    """
+    if not manifest or manifest.get("version") != PAYLOAD_VERSION:
+        return False
+    cursor.execute("SELECT MAX(id) FROM import_log")
+    row = cursor.fetchone()
+    return row is not None and row[0] is not None and manifest.get("import_id") == row[0]
+
+
+def read_payload(cursor, name, payload_dir=PAYLOAD_DIR):
+    """
+    Payload data for name if the pre-rendered files are fresh, else None
+
+    None means the caller should fall back to live queries.
+    """
+    manifest = load_manifest(payload_dir)
+    if not is_fresh(manifest, cursor) or name not in manifest.get("files", {}):
+        return None
+    try:
+        with gzip.open(os.path.join(payload_dir, manifest["files"][name]), "rb") as f:
+            return json.loads(f.read())["data"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def prune_payloads(payload_dir=PAYLOAD_DIR, keep=KEEP_SNAPSHOTS, current=None):
+    """
+    Remove snapshot directories beyond the latest `keep` dates
+
+    Only YYYY-MM-DD directories are touched, and `current` (the snapshot the
+    manifest points at) is never removed. Returns the removed names.
+    """
+    snapshots = sorted(
+        (
+            name
+            for name in os.listdir(payload_dir)
+            if _SNAPSHOT_DIR.match(name) and os.path.isdir(os.path.join(payload_dir, name))
+        ),
+        reverse=True,
+    )
+    removed = []
+    for name in snapshots[keep:]:
+        if name == current:
+            continue
+        shutil.rmtree(os.path.join(payload_dir, name))
+        removed.append(name)
+    return removed
+
+
+def prerender(cursor, snapshot_date, import_id, payload_dir=PAYLOAD_DIR):
+    """
+    Build and write all payloads after an import has committed
+
+    Failures are reported but never raised: the import itself already
+    succeeded and the web tier falls back to live queries.
+    """
+    print(f"\n🗜️  Pre-rendering dashboard payloads to {payload_dir}...")
+    try:
+        payloads = build_payloads(cursor, snapshot_date)
+        manifest = write_payloads(payloads, snapshot_date, import_id, payload_dir)
+    except Exception as e:
+        print(f"   ⚠️  Payload pre-rendering failed (dashboard will query live): {e}")
+        return None
+
+    print(f"   Wrote {len(manifest['files'])} payloads for {manifest['snapshot_date']}")
+
+    try:
+        removed = prune_payloads(payload_dir, current=manifest["snapshot_date"])
+    except OSError as e:
+        print(f"   ⚠️  Could not prune old payloads: {e}")
+    else:
+        if removed:
+            print(f"   Pruned {len(removed)} old snapshot directories")
+    return manifest
+
+
+def latest_import(cursor):
+    """(latest daily_snapshots date, latest import_log id), either may be None"""
+    cursor.execute("SELECT MAX(snapshot_date) FROM daily_snapshots")
+    snapshot_date = cursor.fetchone()[0]
+    cursor.execute("SELECT MAX(id) FROM import_log")
+    import_id = cursor.fetchone()[0]
+    return snapshot_date, import_id
+
+
+def main():
+    """Command-line pre-render of stale payloads"""
+    parser = argparse.ArgumentParser(description="Pre-render dashboard payloads")
+    parser.add_argument("--payload-dir", default=PAYLOAD_DIR)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if payloads are fresh")
+    args = parser.parse_args()
+
+    # Imported here so the payload code has no hard dependency on the importer
+    from import_to_database import connect_db
+
+    conn = connect_db()
+    cursor = conn.cursor()
+    try:
+        if not args.force and is_fresh(load_manifest(args.payload_dir), cursor):
+            print("✓ Dashboard payloads are up to date")
+            return 0
+        snapshot_date, import_id = latest_import(cursor)
+        if snapshot_date is None or import_id is None:
+            print("Nothing to pre-render: no snapshots or no logged imports")
+            return 0
+        manifest = prerender(cursor, snapshot_date, import_id, args.payload_dir)
+    finally:
+        cursor.close()
+        conn.close()
+    return 0 if manifest else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,8 @@
 PHP="/var/packages/PHP8.2/target/usr/local/bin/php82"
 SCRIPT="/volume1/web/circulation/auto_process.php"
 LOGFILE="/volume1/homes/newzware/auto_process.log"
+PYTHON="python3"
+SCRIPTS_DIR="/volume1/circulation/scripts"
 
 # Skip Sundays (day 0) — no Newzware export on Sunday
 if [ "$(date +%w)" -eq 0 ]; then
@@ -24,4 +26,22 @@ fi
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] run-auto-process.sh triggered by Task Scheduler" >> "$LOGFILE"
 
+# Keep subscriber_snapshots partitions three months ahead of the rows the
+# upload is about to insert, so nothing lands in p_future. A failure here
+# is logged and the import still runs.
+echo "[$(date '+%Y-%m-%d %H:%M:%S')] Ensuring future partitions" >> "$LOGFILE"
+"$PYTHON" "$SCRIPTS_DIR/partition_manager.py" --ensure 3 >> "$LOGFILE" 2>&1
+
 "$PHP" "$SCRIPT"
+STATUS=$?
+
+# Post-upload maintenance on the data the PHP importers just wrote.
+# Failures are logged but never change the import's exit status.
+echo "[$(date '+%Y-%m-%d %H:%M:%S')] Building cardinality sketches" >> "$LOGFILE"
+"$PYTHON" "$SCRIPTS_DIR/cardinality_sketches.py" --build-stale >> "$LOGFILE" 2>&1
+
+# Rebuilds the dashboard payloads when the upload logged a new import
+echo "[$(date '+%Y-%m-%d %H:%M:%S')] Pre-rendering dashboard payloads" >> "$LOGFILE"
+"$PYTHON" "$SCRIPTS_DIR/prerender_payloads.py" >> "$LOGFILE" 2>&1
+
+exit $STATUS
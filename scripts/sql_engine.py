@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Circulation Dashboard - In-Database Aggregation Engine
+Alternate import engine that lets MariaDB do the join and GROUP BY
+
+The Python engine (parse_subscriptions) streams every subscription row
+through Python. This engine instead:
+
+1. bulk-loads the raw subscriptions, vacations and rates exports into
+   session TEMPORARY staging tables with LOAD DATA LOCAL INFILE (MariaDB has
+   no unlogged tables; temporary tables are the closest equivalent - never
+   binlogged, dropped with the connection)
+2. builds daily_snapshots and rate_distribution with a few set-based
+   INSERT ... SELECT ... GROUP BY statements joining the staging tables,
+   resolving duplicate (sub_num, paper_code) rows with ROW_NUMBER() by the
+   same most-complete-contact-info rule as the Python engine
+
+Selected with `import_to_database.py --engine sql`. `--engine compare` runs
+both engines on the same files, times them, and diffs the per-paper stats
+and top rates (what daily_snapshots and rate_distribution would receive)
+without writing anything.
+
+The connection must be opened with allow_local_infile=True.
+"""
+
+import csv
+import time
+
+# Staging tables: {table: {csv column: staging column}}
+STAGING_COLUMNS = {
+    "stg_rates": {"rr_code": "rr_code", "rr_edition": "rr_edition", "rr_desc": "rr_desc"},
+    "stg_vacations": {
+        "vd_sp_id": "vd_sp_id",
+        "vd_beg_date": "vd_beg_date",
+        "vd_end_date": "vd_end_date",
+    },
+    "stg_subscriptions": {
+        "sp_num": "sp_num",
+        "sp_stat": "sp_stat",
+        "sp_rate_id": "sp_rate_id",
+        "sp_route": "sp_route",
+        "sp_vac_ind": "sp_vac_ind",
+    },
+}
+
+STAT_COLUMNS = (
+    "total_active",
+    "on_vacation",
+    "deliverable",
+    "mail_delivery",
+    "carrier_delivery",
+    "digital_only",
+    "duplicates_resolved",
+)
+
+# Columns actually written to daily_snapshots
+SNAPSHOT_COLUMNS = STAT_COLUMNS[:-1]
+
+# Vacation dates are MM/DD/YY with month 1-12 and day 1-31; anything else is
+# skipped, as strptime() does in load_vacations(). Days past the end of the
+# month are rejected in _vacation_date_sql(), without STR_TO_DATE warnings.
+VACATION_DATE_PATTERN = "^(0?[1-9]|1[0-2])/(0?[1-9]|[12][0-9]|3[01])/[0-9]{2}$"
+
+# Top N rates per paper written to rate_distribution
+RATE_DISTRIBUTION_TOP = 10
+
+
+def create_staging_tables(cursor, paper_names, business_units):
+    """Create (or reset) the session staging tables and seed the paper lookup"""
+    for table in (
+        *STAGING_COLUMNS,
+        "stg_papers",
+        "stg_rate_map",
+        "stg_vacation_dates",
+        "stg_candidates",
+        "stg_active",
+        "stg_daily",
+        "stg_top_rates",
+    ):
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {table}")
+
+    # line_no preserves file order so "last row wins" matches the Python dict load.
+    # Every column that is joined, grouped, partitioned, sorted or compared is
+    # utf8mb4_bin: the default _ci collation would match 'a' to 'A', where the
+    # Python engine compares exactly. CREATE ... SELECT tables inherit it.
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_rates (
+            line_no INT AUTO_INCREMENT PRIMARY KEY,
+            rr_code VARCHAR(50) COLLATE utf8mb4_bin,
+            rr_edition VARCHAR(10) COLLATE utf8mb4_bin,
+            rr_desc VARCHAR(255)
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_vacations (
+            vd_sp_id VARCHAR(50) COLLATE utf8mb4_bin,
+            vd_beg_date VARCHAR(20), vd_end_date VARCHAR(20),
+            INDEX idx_sp_id (vd_sp_id)
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_subscriptions (
+            line_no INT AUTO_INCREMENT PRIMARY KEY,
+            sp_num VARCHAR(50) COLLATE utf8mb4_bin,
+            sp_stat VARCHAR(5) COLLATE utf8mb4_bin,
+            sp_rate_id VARCHAR(50) COLLATE utf8mb4_bin,
+            sp_route VARCHAR(100) COLLATE utf8mb4_bin,
+            sp_vac_ind VARCHAR(50) COLLATE utf8mb4_bin,
+            phone VARCHAR(50) NOT NULL DEFAULT '',
+            email VARCHAR(255) NOT NULL DEFAULT '',
+            address VARCHAR(255) NOT NULL DEFAULT ''
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_papers (
+            paper_code VARCHAR(10) COLLATE utf8mb4_bin PRIMARY KEY,
+            paper_name VARCHAR(100), business_unit VARCHAR(50)
+        ) ENGINE=InnoDB
+    """)
+    cursor.executemany(
+        "INSERT INTO stg_papers (paper_code, paper_name, business_unit) VALUES (%s, %s, %s)",
+        [(code, name, business_units[code]) for code, name in paper_names.items()],
+    )
+
+
+def load_csv(cursor, path, table, optional_columns=None):
+    """
+    LOAD DATA LOCAL INFILE one export into its staging table
+
+    The header is read in Python only to map column positions: every field is
+    read into a user variable, only the wanted ones are assigned, and each
+    kept value is TRIM()med, matching the .strip() calls in the Python engine.
+    Backslashes are not escape characters, as in Python's csv module.
+
+    optional_columns: {staging column: candidate csv columns} - the first
+    non-empty candidate is kept, as in first_value() in the importer.
+    """
+    wanted = STAGING_COLUMNS[table]
+    optional_columns = optional_columns or {}
+    with open(path, "r", newline="") as f:
+        header = next(csv.reader(f))
+        f.seek(0)
+        line_ending = "\\r\\n" if f.readline().endswith("\r\n") else "\\n"
+
+    positions = {column.strip(): i for i, column in enumerate(header)}
+    targets = [f"@c{i}" for i in range(len(header))]
+    assignments = [
+        f"{target} = TRIM(@c{positions[column]})"
+        for column, target in wanted.items()
+        if column in positions
+    ]
+    for target, candidates in optional_columns.items():
+        present = [f"NULLIF(TRIM(@c{positions[c]}), '')" for c in candidates if c in positions]
+        if present:
+            assignments.append(f"{target} = COALESCE({', '.join(present)}, '')")
+
+    missing = set(wanted) - {c.strip() for c in header}
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(sorted(missing))}")
+
+    cursor.execute(
+        f"""
+        LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+        LINES TERMINATED BY '{line_ending}'
+        IGNORE 1 LINES
+        ({", ".join(targets)})
+        SET {", ".join(assignments)}
+    """,
+        (path,),
+    )
+    return cursor.rowcount
+
+
+def _vacation_date_sql(column):
+    """
+    SQL expression turning a MM/DD/YY column into a DATE, or NULL if invalid
+
+    Built from MAKEDATE() and intervals rather than STR_TO_DATE(), which
+    warns on impossible dates like 02/30 (an error under strict mode inside
+    CREATE ... SELECT). Two-digit years follow strptime's %y: 69-99 are
+    1900s, 00-68 are 2000s. Takes one VACATION_DATE_PATTERN parameter.
+    """
+    month = f"CAST(SUBSTRING_INDEX({column}, '/', 1) AS UNSIGNED)"
+    day = f"CAST(SUBSTRING_INDEX(SUBSTRING_INDEX({column}, '/', 2), '/', -1) AS UNSIGNED)"
+    year = f"CAST(SUBSTRING_INDEX({column}, '/', -1) AS UNSIGNED)"
+    first_of_month = (
+        f"(MAKEDATE(IF({year} < 69, 2000, 1900) + {year}, 1) + INTERVAL ({month} - 1) MONTH)"
+    )
+    # Nested CASE so nothing is CAST until the pattern has matched
+    return (
+        f"CASE WHEN {column} REGEXP %s THEN "
+        f"CASE WHEN {day} <= DAY(LAST_DAY({first_of_month})) "
+        f"THEN {first_of_month} + INTERVAL ({day} - 1) DAY END END"
+    )
+
+
+def aggregate(cursor, snapshot_date):
+    """
+    Build stg_active (one row per counted subscription) and stg_daily
+    (one row per paper) with set-based statements
+
+    Mirrors parse_subscriptions(): active status, rate found with a known
+    edition (last rates row wins), vacation active on snapshot_date, and
+    MAIL / INTERNET / everything-else delivery classification. Each paper's
+    stats also carry top_rates: (rate_id, description, count) for the top
+    RATE_DISTRIBUTION_TOP rates, as staged in stg_top_rates.
+    """
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_rate_map (
+            rr_code VARCHAR(50) COLLATE utf8mb4_bin PRIMARY KEY,
+            rr_edition VARCHAR(10) COLLATE utf8mb4_bin,
+            rr_desc VARCHAR(255)
+        ) ENGINE=InnoDB
+        SELECT r.rr_code, r.rr_edition, r.rr_desc
+        FROM stg_rates r
+        JOIN (
+            SELECT rr_code, MAX(line_no) AS line_no
+            FROM stg_rates
+            WHERE rr_code != '' AND rr_edition != ''
+            GROUP BY rr_code
+        ) latest ON latest.line_no = r.line_no
+    """)
+
+    # Parsed vacation dates; a vacation with an invalid date is skipped entirely,
+    # like the ValueError path in load_vacations()
+    cursor.execute(
+        f"""
+        CREATE TEMPORARY TABLE stg_vacation_dates ENGINE=InnoDB
+        SELECT vd_sp_id,
+               {_vacation_date_sql("vd_beg_date")} AS beg_date,
+               vd_end_date = '' AS open_ended,
+               {_vacation_date_sql("vd_end_date")} AS end_date
+        FROM stg_vacations
+    """,
+        (VACATION_DATE_PATTERN, VACATION_DATE_PATTERN),
+    )
+
+    # Every counted row, ranked within its (sub_num, paper_code) group:
+    # most complete contact info first, later rows breaking ties
+    cursor.execute(
+        """
+        CREATE TEMPORARY TABLE stg_candidates ENGINE=InnoDB
+        SELECT s.sp_num,
+               s.sp_rate_id,
+               rm.rr_edition AS paper_code,
+               CASE UPPER(s.sp_route)
+                   WHEN 'MAIL' THEN 'mail'
+                   WHEN 'INTERNET' THEN 'digital'
+                   ELSE 'carrier'
+               END AS delivery_type,
+               EXISTS (
+                   SELECT 1 FROM stg_vacation_dates v
+                   WHERE v.vd_sp_id = s.sp_vac_ind
+                     AND v.beg_date <= %s
+                     AND (v.open_ended OR v.end_date >= %s)
+               ) AND s.sp_vac_ind != '0' AS is_on_vacation,
+               ROW_NUMBER() OVER (
+                   PARTITION BY s.sp_num, rm.rr_edition
+                   ORDER BY (s.phone != '') + (s.email != '') + (s.address != '') DESC,
+                            s.line_no DESC
+               ) AS dup_rank
+        FROM stg_subscriptions s
+        JOIN stg_rate_map rm ON rm.rr_code = s.sp_rate_id
+        JOIN stg_papers p ON p.paper_code = rm.rr_edition
+        WHERE s.sp_stat = 'A'
+    """,
+        (snapshot_date, snapshot_date),
+    )
+
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_active ENGINE=InnoDB
+        SELECT sp_num, sp_rate_id, paper_code, delivery_type, is_on_vacation
+        FROM stg_candidates
+        WHERE dup_rank = 1
+    """)
+
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_daily ENGINE=InnoDB
+        SELECT a.paper_code, p.paper_name, p.business_unit,
+               COUNT(*) AS total_active,
+               SUM(a.is_on_vacation) AS on_vacation,
+               SUM(NOT a.is_on_vacation) AS deliverable,
+               SUM(a.delivery_type = 'mail') AS mail_delivery,
+               SUM(a.delivery_type = 'carrier') AS carrier_delivery,
+               SUM(a.delivery_type = 'digital') AS digital_only,
+               COALESCE(MAX(dup.duplicates_resolved), 0) AS duplicates_resolved
+        FROM stg_active a
+        JOIN stg_papers p ON p.paper_code = a.paper_code
+        LEFT JOIN (
+            SELECT paper_code, COUNT(*) AS duplicates_resolved
+            FROM stg_candidates
+            WHERE dup_rank > 1
+            GROUP BY paper_code
+        ) dup ON dup.paper_code = a.paper_code
+        GROUP BY a.paper_code, p.paper_name, p.business_unit
+    """)
+
+    cursor.execute(
+        """
+        CREATE TEMPORARY TABLE stg_top_rates ENGINE=InnoDB
+        SELECT paper_code, sp_rate_id, rr_desc, subscriber_count, rank_position
+        FROM (
+            SELECT a.paper_code, a.sp_rate_id, rm.rr_desc,
+                   COUNT(*) AS subscriber_count,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY a.paper_code ORDER BY COUNT(*) DESC, a.sp_rate_id
+                   ) AS rank_position
+            FROM stg_active a
+            JOIN stg_rate_map rm ON rm.rr_code = a.sp_rate_id
+            GROUP BY a.paper_code, a.sp_rate_id, rm.rr_desc
+        ) ranked
+        WHERE rank_position <= %s
+    """,
+        (RATE_DISTRIBUTION_TOP,),
+    )
+
+    cursor.execute(f"SELECT paper_code, {', '.join(STAT_COLUMNS)} FROM stg_daily")
+    stats_by_paper = {
+        row[0]: {column: int(value) for column, value in zip(STAT_COLUMNS, row[1:])}
+        for row in cursor.fetchall()
+    }
+    for stats in stats_by_paper.values():
+        stats["top_rates"] = []
+
+    cursor.execute("""
+        SELECT paper_code, sp_rate_id, rr_desc, subscriber_count
+        FROM stg_top_rates
+        ORDER BY paper_code, rank_position
+    """)
+    for paper_code, rate_id, description, count in cursor.fetchall():
+        stats_by_paper[paper_code]["top_rates"].append((rate_id, description, int(count)))
+    return stats_by_paper
+
+
+def publish(cursor, snapshot_date):
+    """Write stg_daily to daily_snapshots and the top rates to rate_distribution"""
+    cursor.execute(
+        f"""
+        INSERT INTO daily_snapshots
+        (snapshot_date, paper_code, paper_name, business_unit, {", ".join(SNAPSHOT_COLUMNS)})
+        SELECT %s, paper_code, paper_name, business_unit, {", ".join(SNAPSHOT_COLUMNS)}
+        FROM stg_daily
+        ON DUPLICATE KEY UPDATE
+         {", ".join(f"{column} = VALUES({column})" for column in SNAPSHOT_COLUMNS)}
+    """,
+        (snapshot_date,),
+    )
+
+    # rate_distribution has no unique key - replace this date's rows for these papers
+    cursor.execute(
+        """
+        DELETE rd FROM rate_distribution rd
+        JOIN stg_daily d ON d.paper_code = rd.paper_code
+        WHERE rd.snapshot_date = %s
+    """,
+        (snapshot_date,),
+    )
+    cursor.execute(
+        """
+        INSERT INTO rate_distribution
+        (snapshot_date, paper_code, rate_id, rate_description,
+         subscriber_count, percentage, rank_position)
+        SELECT %s, t.paper_code, t.sp_rate_id, t.rr_desc, t.subscriber_count,
+               ROUND(t.subscriber_count / d.total_active * 100, 2), t.rank_position
+        FROM stg_top_rates t
+        JOIN stg_daily d ON d.paper_code = t.paper_code
+    """,
+        (snapshot_date,),
+    )
+
+
+def run_sql_engine(
+    cursor, snapshot_date, files, paper_names, business_units, contact_columns=None, write=True
+):
+    """
+    Stage, aggregate and (optionally) publish one import in the database
+
+    files: {"subscriptions": path, "vacations": path, "rates": path}
+    contact_columns: {"phone"/"email"/"address": candidate csv columns} used
+    to rank duplicate subscribers
+    Returns (stats_by_paper, seconds).
+    """
+    started = time.perf_counter()
+
+    print("\n🗄️  Staging exports with LOAD DATA LOCAL INFILE...")
+    create_staging_tables(cursor, paper_names, business_units)
+    for table, key in (
+        ("stg_rates", "rates"),
+        ("stg_vacations", "vacations"),
+        ("stg_subscriptions", "subscriptions"),
+    ):
+        optional = contact_columns if table == "stg_subscriptions" else None
+        rows = load_csv(cursor, files[key], table, optional)
+        print(f"   {table}: {rows:,} rows")
+
+    stats_by_paper = aggregate(cursor, snapshot_date)
+    if write:
+        print("\n💾 Building daily_snapshots and rate_distribution in SQL...")
+        publish(cursor, snapshot_date)
+        print(f"   Inserted {len(stats_by_paper)} paper snapshots")
+
+    return stats_by_paper, time.perf_counter() - started
+
+
+def compare_results(python_stats, sql_stats):
+    """Return a list of human-readable differences between the two engines"""
+    differences = []
+    for paper_code in sorted(set(python_stats) | set(sql_stats)):
+        if paper_code not in sql_stats:
+            differences.append(f"{paper_code}: missing from SQL engine")
+            continue
+        if paper_code not in python_stats:
+            differences.append(f"{paper_code}: missing from Python engine")
+            continue
+        for column in STAT_COLUMNS:
+            py_value = python_stats[paper_code][column]
+            sql_value = sql_stats[paper_code][column]
+            if py_value != sql_value:
+                differences.append(f"{paper_code}.{column}: python={py_value} sql={sql_value}")
+
+        py_rates = [tuple(rate) for rate in python_stats[paper_code].get("top_rates", [])]
+        sql_rates = [tuple(rate) for rate in sql_stats[paper_code].get("top_rates", [])]
+        if py_rates != sql_rates:
+            differences.append(f"{paper_code}.top_rates: python={py_rates} sql={sql_rates}")
+    return differences
+
+
+def print_benchmark(python_seconds, sql_seconds, differences):
+    """Print engine timings and the comparison outcome"""
+    print("\n" + "=" * 60)
+    print("⏱️  ENGINE COMPARISON")
+    print("=" * 60)
+    print(f"Python engine: {python_seconds:8.3f}s")
+    print(f"SQL engine:    {sql_seconds:8.3f}s")
+    if sql_seconds > 0:
+        print(f"Speedup:       {python_seconds / sql_seconds:8.2f}x")
+    print("-" * 60)
+    if differences:
+        print(f"❌ {len(differences)} differences:")
+        for difference in differences:
+            print(f"   {difference}")
+    else:
+        print("✅ Results identical")
+    print("=" * 60)
@@ -2,6 +2,14 @@
 -- Date: 2025-12-05
 -- Problem: Multiple uploads create duplicate rows for same subscriber on same snapshot_date
 -- Solution: Add unique constraint and clean up duplicates
+-- Note: both import paths now resolve duplicates while parsing, using the same
+--       "most complete contact info wins, ties go to the later row" rule:
+--       web/lib/AllSubscriberImporter.php (the only writer of subscriber_snapshots)
+--       and scripts/import_to_database.py (daily_snapshots counts only). The
+--       standard subscriptions export read by the Python importer has no phone,
+--       email or address columns, so there every duplicate is equally complete
+--       and the later row wins. Rows loaded before that change can still hold
+--       duplicates; this script cleans them up.
 
 USE circulation_dashboard;
 
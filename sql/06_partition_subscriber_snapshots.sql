@@ -82,6 +82,9 @@ COMMENT='Partitioned subscriber snapshots - optimized for temporal queries'
 
 -- Partition by snapshot_date using RANGE
 -- Creates monthly partitions for efficient queries on recent data
+-- Later months are split out of p_future by scripts/partition_manager.py
+-- --ensure 3, which scripts/run-auto-process.sh runs before each daily
+-- upload (--report shows per-partition sizes)
 PARTITION BY RANGE (TO_DAYS(snapshot_date)) (
     -- 2025 partitions
     PARTITION p2025_11 VALUES LESS THAN (TO_DAYS('2025-12-01')) COMMENT 'November 2025',
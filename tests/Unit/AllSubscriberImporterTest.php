@@ -0,0 +1,105 @@
+<?php
+
+namespace NWDownloads\Tests\Unit;
+
+use PHPUnit\Framework\TestCase;
+use CirculationDashboard\AllSubscriberImporter;
+
+require_once PROJECT_ROOT . '/web/lib/AllSubscriberImporter.php';
+
+/**
+ * Test duplicate-subscriber resolution and the weekly recount
+ *
+ * Same rule as sql/06_fix_duplicate_subscribers.sql: per (SUB NUM, Ed) the
+ * row with the most complete contact info wins, ties go to the later row.
+ */
+class AllSubscriberImporterTest extends TestCase
+{
+    /**
+     * @param array<string, mixed> $overrides
+     * @return array<string, mixed>
+     */
+    private function record(array $overrides = []): array
+    {
+        return array_merge([
+            'snapshot_date' => '2026-10-10',
+            'week_num' => 41,
+            'year' => 2026,
+            'sub_num' => '1001',
+            'paper_code' => 'TJ',
+            'paper_name' => 'The Journal',
+            'business_unit' => 'Wyoming',
+            'delivery_type' => 'CARR',
+            'payment_status' => 'PAID',
+            'on_vacation' => 0,
+            'phone' => '',
+            'email' => '',
+            'address' => '',
+        ], $overrides);
+    }
+
+    public function testMoreCompleteEarlierRowSurvives(): void
+    {
+        $records = [];
+        AllSubscriberImporter::addSubscriberRecord(
+            $records,
+            $this->record(['phone' => '307-555-0100', 'address' => '1 Main St', 'delivery_type' => 'MAIL'])
+        );
+        $duplicate = AllSubscriberImporter::addSubscriberRecord(
+            $records,
+            $this->record(['email' => 'a@example.com'])
+        );
+
+        $this->assertTrue($duplicate);
+        $this->assertCount(1, $records);
+        $this->assertSame('MAIL', $records['1001|TJ']['delivery_type']);
+    }
+
+    public function testEquallyCompleteLaterRowWins(): void
+    {
+        $records = [];
+        AllSubscriberImporter::addSubscriberRecord($records, $this->record(['delivery_type' => 'MAIL']));
+        AllSubscriberImporter::addSubscriberRecord($records, $this->record(['delivery_type' => 'INTE']));
+
+        $this->assertSame('INTE', $records['1001|TJ']['delivery_type']);
+    }
+
+    public function testSameSubscriberOnAnotherPaperIsNotADuplicate(): void
+    {
+        $records = [];
+        AllSubscriberImporter::addSubscriberRecord($records, $this->record());
+        $duplicate = AllSubscriberImporter::addSubscriberRecord($records, $this->record(['paper_code' => 'TA']));
+
+        $this->assertFalse($duplicate);
+        $this->assertCount(2, $records);
+    }
+
+    public function testWeeklySnapshotsCountEachSubscriberOnce(): void
+    {
+        $records = [];
+        $duplicates = 0;
+        foreach ([
+            $this->record(['sub_num' => '1001', 'delivery_type' => 'CARR']),
+            $this->record(['sub_num' => '1001', 'delivery_type' => 'MAIL', 'phone' => '307-555-0100']),
+            $this->record(['sub_num' => '1002', 'delivery_type' => 'INTE', 'payment_status' => 'COMP']),
+            $this->record(['sub_num' => '1003', 'on_vacation' => 1]),
+            $this->record(['sub_num' => '1003', 'on_vacation' => 1]),
+        ] as $record) {
+            if (AllSubscriberImporter::addSubscriberRecord($records, $record)) {
+                $duplicates++;
+            }
+        }
+
+        $snapshots = AllSubscriberImporter::buildWeeklySnapshots($records);
+
+        $this->assertSame(2, $duplicates);
+        $this->assertSame(['41|2026|TJ'], array_keys($snapshots));
+        $snapshot = $snapshots['41|2026|TJ'];
+        $this->assertSame(3, $snapshot['total_active']);
+        $this->assertSame(1, $snapshot['mail_delivery']);
+        $this->assertSame(1, $snapshot['carrier_delivery']);
+        $this->assertSame(1, $snapshot['digital_only']);
+        $this->assertSame(1, $snapshot['comp_count']);
+        $this->assertSame(1, $snapshot['on_vacation']);
+    }
+}
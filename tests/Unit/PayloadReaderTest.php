@@ -0,0 +1,101 @@
+<?php
+
+namespace NWDownloads\Tests\Unit;
+
+use PHPUnit\Framework\TestCase;
+use CirculationDashboard\PayloadReader;
+use PDO;
+
+require_once PROJECT_ROOT . '/web/lib/PayloadReader.php';
+
+/**
+ * Test reading pre-rendered dashboard payloads
+ *
+ * Files are laid out the way scripts/prerender_payloads.py writes them;
+ * import_log lives in an in-memory SQLite database.
+ */
+class PayloadReaderTest extends TestCase
+{
+    private PDO $pdo;
+    private string $dir;
+
+    protected function setUp(): void
+    {
+        $this->pdo = new PDO('sqlite::memory:');
+        $this->pdo->exec("CREATE TABLE import_log (id INTEGER PRIMARY KEY, file_type TEXT)");
+        $this->pdo->exec("INSERT INTO import_log (id, file_type) VALUES (7, 'subscriptions')");
+
+        $this->dir = sys_get_temp_dir() . '/payloads-' . uniqid();
+        mkdir($this->dir . '/2026-10-17', 0777, true);
+        file_put_contents(
+            $this->dir . '/2026-10-17/overview.v1.json.gz',
+            gzencode(json_encode(['version' => 1, 'data' => ['totals' => ['total_active' => 42]]]))
+        );
+        $this->writeManifest(['overview' => '2026-10-17/overview.v1.json.gz']);
+    }
+
+    protected function tearDown(): void
+    {
+        foreach (glob($this->dir . '/*/*') as $file) {
+            unlink($file);
+        }
+        foreach (glob($this->dir . '/*') as $path) {
+            is_dir($path) ? rmdir($path) : unlink($path);
+        }
+        rmdir($this->dir);
+    }
+
+    /**
+     * @param array<string, string> $files
+     */
+    private function writeManifest(array $files, int $importId = 7, int $version = 1): void
+    {
+        file_put_contents($this->dir . '/manifest.json', json_encode([
+            'version' => $version,
+            'snapshot_date' => '2026-10-17',
+            'import_id' => $importId,
+            'files' => $files,
+        ]));
+    }
+
+    public function testReadsFreshPayload(): void
+    {
+        $reader = new PayloadReader($this->pdo, $this->dir);
+
+        $this->assertSame(['totals' => ['total_active' => 42]], $reader->read('overview'));
+    }
+
+    public function testLaterImportMakesPayloadStale(): void
+    {
+        // e.g. an AllSubscriberReport upload logged after the pre-render
+        $this->pdo->exec("INSERT INTO import_log (id, file_type) VALUES (8, 'all_subscriber')");
+        $reader = new PayloadReader($this->pdo, $this->dir);
+
+        $this->assertNull($reader->read('overview'));
+    }
+
+    public function testOtherPayloadVersionIsIgnored(): void
+    {
+        $this->writeManifest(['overview' => '2026-10-17/overview.v1.json.gz'], 7, 2);
+        $reader = new PayloadReader($this->pdo, $this->dir);
+
+        $this->assertNull($reader->read('overview'));
+    }
+
+    public function testMissingManifestOrFileFallsBack(): void
+    {
+        $reader = new PayloadReader($this->pdo, $this->dir);
+        $this->assertNull($reader->read('paper_cards'));
+
+        unlink($this->dir . '/manifest.json');
+        $this->assertNull($reader->read('overview'));
+    }
+
+    public function testManifestPathsOutsidePayloadDirAreRejected(): void
+    {
+        $this->writeManifest(['overview' => '../../etc/passwd']);
+        $reader = new PayloadReader($this->pdo, $this->dir);
+
+        $this->assertNull($reader->read('overview'));
+    }
+}
@@ -0,0 +1,59 @@
+"""
+Shared fixtures for the Python import script tests
+
+scripts/ is a flat directory of standalone scripts rather than a package, so
+it is put on sys.path the same way running `python3 scripts/<name>.py` does.
+"""
+
+import os
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "scripts")
+sys.path.insert(0, os.path.abspath(SCRIPTS_DIR))
+
+
+class RecordingCursor:
+    """
+    Minimal DB-API cursor double
+
+    Records every statement and answers fetches from a queue of canned
+    results, so SQL-building code can be tested without a database.
+    """
+
+    def __init__(self, results=None):
+        self.statements = []
+        self.results = list(results or [])
+        self.lastrowid = None
+        self.rowcount = 0
+        self._current = []
+
+    def execute(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+        if self.results and query.lstrip().upper().startswith("SELECT"):
+            self._current = self.results.pop(0)
+        else:
+            self._current = []
+
+    def executemany(self, query, seq):
+        self.statements.append((" ".join(query.split()), list(seq)))
+
+    def fetchall(self):
+        return list(self._current)
+
+    def fetchone(self):
+        return self._current[0] if self._current else None
+
+    def fetchmany(self, size=1):
+        batch, self._current = self._current[:size], self._current[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def recording_cursor():
+    """Factory for RecordingCursor with canned SELECT results"""
+    return RecordingCursor
@@ -0,0 +1,144 @@
+"""Tests for scripts/cardinality_sketches.py"""
+
+import random
+
+import pytest
+
+from cardinality_sketches import (
+    HyperLogLog,
+    build_sketches,
+    estimate_distinct,
+    normalize_address,
+    normalize_phone,
+    normalize_route,
+    save_sketches,
+)
+
+
+def _sketch(values, precision=12):
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.mark.parametrize("n", [1000, 20000, 100000])
+def test_count_within_three_standard_errors(n):
+    sketch = _sketch(f"subscriber-{i}" for i in range(n))
+    assert abs(sketch.count() - n) / n < 3 * sketch.standard_error()
+
+
+def test_count_ignores_repeated_values():
+    sketch = _sketch(["123 MAIN ST"] * 50 + ["9 ELM ST"] * 50)
+    assert sketch.count() == 2
+
+
+def test_empty_sketch_counts_zero():
+    assert HyperLogLog().count() == 0
+
+
+def test_merge_matches_per_register_max():
+    rng = random.Random(12)
+    for precision in (4, 8, 12):
+        size = 1 << precision
+        a = HyperLogLog(precision, bytes(rng.randint(0, 61) for _ in range(size)))
+        b = HyperLogLog(precision, bytes(rng.randint(0, 61) for _ in range(size)))
+        expected = bytearray(map(max, a.registers, b.registers))
+        assert a.merge(b).registers == expected
+
+
+def test_merge_equals_sketch_of_union():
+    left = _sketch(str(i) for i in range(0, 30000))
+    right = _sketch(str(i) for i in range(20000, 50000))
+    union = _sketch(str(i) for i in range(0, 50000))
+    assert left.merge(right).registers == union.registers
+
+
+def test_merge_rejects_different_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
+
+
+def test_blob_round_trip():
+    sketch = _sketch(str(i) for i in range(5000))
+    restored = HyperLogLog.from_blob(sketch.to_blob())
+    assert restored.precision == sketch.precision
+    assert restored.registers == sketch.registers
+    assert restored.count() == sketch.count()
+
+
+def test_blob_rejects_unknown_version():
+    blob = bytearray(HyperLogLog().to_blob())
+    blob[0] = 99
+    with pytest.raises(ValueError):
+        HyperLogLog.from_blob(bytes(blob))
+
+
+def test_normalizers():
+    assert normalize_address("123 North Main Street.") == "123 N MAIN ST"
+    assert normalize_address("123  n main st") == "123 N MAIN ST"
+    assert normalize_phone("1 (803) 555-1212") == "8035551212"
+    assert normalize_phone("555-1212") is None
+    assert normalize_route(" r12 ") == "R12"
+    assert normalize_route("MAIL") is None
+
+
+def test_exact_mode_normalizes_like_sketches(recording_cursor):
+    cursor = recording_cursor([[("123 North Main Street.",), ("123 N Main St",), ("9 Elm St",)]])
+    assert estimate_distinct(cursor, "address", exact=True) == (2, 0.0)
+
+
+def test_exact_mode_drops_invalid_phones(recording_cursor):
+    cursor = recording_cursor([[("803-555-1212",), ("18035551212",), ("555-1212",)]])
+    assert estimate_distinct(cursor, "phone", exact=True) == (1, 0.0)
+
+
+def test_missing_sketches_fall_back_to_exact(recording_cursor):
+    # 1 snapshot without a sketch, no sketch rows, then the exact query
+    cursor = recording_cursor([[(1,)], [], [("R1",), ("R2",)]])
+    assert estimate_distinct(cursor, "route", ["TJ"]) == (2, 0.0)
+    assert "FROM subscriber_snapshots" in cursor.statements[-1][0]
+
+
+def test_empty_or_outdated_sketches_count_as_missing(recording_cursor):
+    cursor = recording_cursor([[(0,)], []])
+    estimate_distinct(cursor, "phone")
+    coverage = cursor.statements[0][0]
+    assert "c.estimated_count = 0" in coverage
+    assert "c.updated_at < d.created_at" in coverage
+    # Only snapshots with subscriber rows are expected to have sketches
+    assert "EXISTS (SELECT 1 FROM subscriber_snapshots s" in coverage
+
+
+def test_empty_sketches_are_not_saved(recording_cursor):
+    cursor = recording_cursor()
+    save_sketches(
+        cursor, "2026-10-12", "TJ", {"address": _sketch(["1 MAIN ST"]), "phone": HyperLogLog()}
+    )
+    assert [params[2] for _, params in cursor.statements] == ["address"]
+
+
+def test_build_sketches_from_subscriber_snapshots(recording_cursor):
+    rows = [
+        ("TJ", "123 North Main Street.", "(803) 555-1212", "R1"),
+        ("TJ", "123 N Main St", "803-555-1212", "MAIL"),
+        ("TJ", "9 Elm St", "", "R2"),
+        ("TA", None, None, "INTERNET"),
+    ]
+    cursor = recording_cursor([rows])
+    built = build_sketches(cursor, "2026-10-12")
+
+    assert built == {"TJ": {"address": 2, "phone": 1, "route": 2}, "TA": {}}
+    queries = [query for query, _ in cursor.statements]
+    assert queries[1] == "DELETE FROM cardinality_sketches WHERE snapshot_date = %s"
+    saved = [(params[1], params[2]) for query, params in cursor.statements[2:]]
+    assert saved == [("TJ", "address"), ("TJ", "phone"), ("TJ", "route")]
+
+
+def test_approximate_mode_merges_stored_sketches(recording_cursor):
+    tj = _sketch(str(i) for i in range(300))
+    ta = _sketch(str(i) for i in range(200, 500))
+    cursor = recording_cursor([[(0,)], [(tj.to_blob(),), (ta.to_blob(),)]])
+    count, error = estimate_distinct(cursor, "address", ["TJ", "TA"])
+    assert abs(count - 500) <= 10
+    assert error > 0
@@ -0,0 +1,211 @@
+"""Tests for scripts/import_to_database.py"""
+
+import json
+
+import pytest
+
+import import_to_database
+
+
+def _write_site(directory, subscriptions=None):
+    """Write a minimal Newzware export drop; omit subscriptions to simulate a missing file"""
+    directory.mkdir()
+    (directory / "rates_latest.csv").write_text("rr_code,rr_edition,rr_desc\n1,TJ,Standard\n")
+    (directory / "vacations_latest.csv").write_text("vd_sp_id,vd_beg_date,vd_end_date\n")
+    if subscriptions is not None:
+        (directory / "subscriptions_latest.csv").write_text(subscriptions)
+    return str(directory)
+
+
+def _write_manifest(tmp_path, data_dir):
+    manifest = tmp_path / "sites.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "sites": [
+                    {
+                        "name": "South Carolina",
+                        "data_dir": data_dir,
+                        "editions": {"TJ": "The Journal"},
+                    }
+                ]
+            }
+        )
+    )
+    return str(manifest)
+
+
+class FakeConnection:
+    """Connection double recording commit/rollback around a RecordingCursor"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+        self.rolled_back = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        pass
+
+
+def test_batch_parse_failure_commits_nothing(tmp_path, monkeypatch, capsys):
+    manifest = _write_manifest(tmp_path, _write_site(tmp_path / "sc"))
+
+    def fail_connect(**options):
+        raise AssertionError("database must not be touched when parsing fails")
+
+    monkeypatch.setattr(import_to_database, "connect_db", fail_connect)
+
+    with pytest.raises(SystemExit) as exit_info:
+        import_to_database.run_batch(manifest)
+
+    assert exit_info.value.code == 1
+    assert "no sites committed" in capsys.readouterr().out
+
+
+def test_batch_failure_after_commit_is_not_reported_as_rollback(
+    tmp_path, monkeypatch, capsys, recording_cursor
+):
+    data_dir = _write_site(
+        tmp_path / "sc", "sp_num,sp_stat,sp_rate_id,sp_route,sp_vac_ind\n1,A,1,R1,0\n"
+    )
+    conn = FakeConnection(recording_cursor())
+
+    def fail_partitions(cursor):
+        raise RuntimeError("partition DDL failed")
+
+    monkeypatch.setattr(import_to_database, "connect_db", lambda **options: conn)
+    monkeypatch.setattr(import_to_database, "maintain_partitions", fail_partitions)
+
+    with pytest.raises(RuntimeError):
+        import_to_database.run_batch(_write_manifest(tmp_path, data_dir))
+
+    assert conn.committed and not conn.rolled_back
+    assert "no sites committed" not in capsys.readouterr().out
+
+
+def _write_exports(tmp_path, subscriptions):
+    rates = tmp_path / "rates.csv"
+    rates.write_text("rr_code,rr_edition,rr_desc\n101,TJ,Standard\n102,TJ,Senior\n103,TJ,Digital\n")
+    path = tmp_path / "subscriptions.csv"
+    path.write_text(subscriptions)
+    return import_to_database.load_rates(str(rates)), str(path)
+
+
+def test_top_rates_ranked_by_count_then_rate_id(tmp_path):
+    rate_map, path = _write_exports(
+        tmp_path,
+        "sp_num,sp_stat,sp_rate_id,sp_route,sp_vac_ind\n"
+        "1,A,102,R1,0\n2,A,101,R1,0\n3,A,103,R1,0\n4,A,103,R1,0\n",
+    )
+    stats = import_to_database.parse_subscriptions(rate_map, {}, path, {"TJ": "The Journal"})
+    assert stats["TJ"]["top_rates"] == [
+        ("103", "Digital", 2),
+        ("101", "Standard", 1),
+        ("102", "Senior", 1),
+    ]
+
+
+def test_save_snapshots_replaces_rate_distribution(recording_cursor):
+    cursor = recording_cursor()
+    stats = {
+        "total_active": 4,
+        "on_vacation": 0,
+        "deliverable": 4,
+        "mail_delivery": 0,
+        "carrier_delivery": 4,
+        "digital_only": 0,
+        "top_rates": [("103", "Digital", 3), ("101", "Standard", 1)],
+    }
+    import_to_database.save_snapshots(
+        cursor, "2026-10-18", {"TJ": stats}, {"TJ": "The Journal"}, {"TJ": "SC"}
+    )
+    queries = [query for query, _ in cursor.statements]
+    assert queries[1].startswith("DELETE FROM rate_distribution")
+    assert cursor.statements[2][1] == [
+        ("2026-10-18", "TJ", "103", "Digital", 3, 75.0, 1),
+        ("2026-10-18", "TJ", "101", "Standard", 1, 25.0, 2),
+    ]
+
+
+# Standard subscriptions export: no contact columns
+STANDARD_HEADER = "sp_num,sp_stat,sp_rate_id,sp_route,sp_vac_ind\n"
+# Site template that adds contact columns (see CONTACT_COLUMNS)
+CONTACT_HEADER = "sp_num,sp_stat,sp_rate_id,sp_route,sp_vac_ind,sp_phone,sp_email,sp_address\n"
+
+
+def test_standard_export_later_duplicate_wins(tmp_path):
+    rate_map, path = _write_exports(
+        tmp_path,
+        STANDARD_HEADER + "1,A,101,MAIL,0\n" + "1,A,102,INTERNET,0\n",
+    )
+    stats = import_to_database.parse_subscriptions(rate_map, {}, path, {"TJ": "The Journal"})
+    assert stats["TJ"]["total_active"] == 1
+    assert stats["TJ"]["digital_only"] == 1
+    assert stats["TJ"]["duplicates_resolved"] == 1
+
+
+def test_contact_template_more_complete_earlier_row_survives(tmp_path):
+    rate_map, path = _write_exports(
+        tmp_path,
+        CONTACT_HEADER
+        + "1,A,101,MAIL,0,803-555-1212,a@example.com,1 Main St\n"
+        + "1,A,101,R1,0,,,1 Main St\n",
+    )
+    stats = import_to_database.parse_subscriptions(rate_map, {}, path, {"TJ": "The Journal"})
+    assert stats["TJ"]["total_active"] == 1
+    assert stats["TJ"]["mail_delivery"] == 1
+    assert stats["TJ"]["carrier_delivery"] == 0
+    assert stats["TJ"]["duplicates_resolved"] == 1
+
+
+def test_contact_template_equally_complete_later_row_wins(tmp_path):
+    rate_map, path = _write_exports(
+        tmp_path,
+        CONTACT_HEADER + "1,A,101,MAIL,0,803-555-1212,,\n" + "1,A,102,INTERNET,0,,a@example.com,\n",
+    )
+    stats = import_to_database.parse_subscriptions(rate_map, {}, path, {"TJ": "The Journal"})
+    assert stats["TJ"]["total_active"] == 1
+    assert stats["TJ"]["digital_only"] == 1
+    assert stats["TJ"]["top_rates"] == [("102", "Senior", 1)]
+
+
+def test_duplicates_resolved_counted_per_paper(tmp_path):
+    rates = tmp_path / "rates.csv"
+    rates.write_text("rr_code,rr_edition,rr_desc\n101,TJ,Standard\n201,TA,Standard\n")
+    path = tmp_path / "subscriptions.csv"
+    # Subscriber 1 appears three times in TJ and once in TA - only TJ has duplicates
+    path.write_text(
+        STANDARD_HEADER
+        + "1,A,101,R1,0\n1,A,101,R1,0\n1,A,101,R1,0\n"
+        + "1,A,201,R1,0\n2,A,201,R1,0\n"
+    )
+    stats = import_to_database.parse_subscriptions(
+        import_to_database.load_rates(str(rates)),
+        {},
+        str(path),
+        {"TJ": "The Journal", "TA": "The Advertiser"},
+    )
+    assert (stats["TJ"]["total_active"], stats["TJ"]["duplicates_resolved"]) == (1, 2)
+    assert (stats["TA"]["total_active"], stats["TA"]["duplicates_resolved"]) == (2, 0)
+
+
+def test_sql_engine_ranks_duplicates_by_the_same_rule(recording_cursor):
+    from sql_engine import aggregate
+
+    cursor = recording_cursor()
+    aggregate(cursor, "2026-10-18")
+    candidates = next(query for query, _ in cursor.statements if "stg_candidates ENGINE" in query)
+    assert (
+        "PARTITION BY s.sp_num, rm.rr_edition "
+        "ORDER BY (s.phone != '') + (s.email != '') + (s.address != '') DESC, "
+        "s.line_no DESC"
+    ) in candidates
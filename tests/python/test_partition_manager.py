@@ -0,0 +1,78 @@
+"""Tests for scripts/partition_manager.py"""
+
+from datetime import date
+
+import pytest
+
+from partition_manager import _add_months, archive_partition, expired_months, months_to_create
+
+
+def _partitions(*names):
+    return [{"name": name} for name in names]
+
+
+def test_add_months_crosses_year_boundaries():
+    assert _add_months(2026, 12, 1) == (2027, 1)
+    assert _add_months(2026, 11, 14) == (2028, 1)
+    assert _add_months(2027, 1, -1) == (2026, 12)
+    assert _add_months(2026, 3, -24) == (2024, 3)
+
+
+def test_months_to_create_continues_after_latest_partition():
+    existing = {(2026, 11): None, (2026, 12): None}
+    assert months_to_create(existing, 3, date(2026, 12, 18)) == [(2027, 1), (2027, 2), (2027, 3)]
+
+
+def test_months_to_create_fills_gap_since_latest_partition():
+    existing = {(2026, 8): None}
+    assert months_to_create(existing, 1, date(2026, 10, 18)) == [(2026, 9), (2026, 10), (2026, 11)]
+
+
+def test_months_to_create_starts_at_today_without_partitions():
+    assert months_to_create({}, 2, date(2026, 11, 3)) == [(2026, 11), (2026, 12), (2027, 1)]
+
+
+def test_months_to_create_nothing_when_far_enough_ahead():
+    assert months_to_create({(2027, 3): None}, 3, date(2026, 12, 1)) == []
+
+
+def test_expired_months_oldest_first():
+    partitions = _partitions("p_future", "p2025_02", "p2024_12", "p2025_01", "p2025_03")
+    expired = expired_months(partitions, 24, date(2027, 2, 10))
+    assert [month for month, _ in expired] == [(2024, 12), (2025, 1)]
+
+
+def _statements(cursor):
+    return [query for query, _ in cursor.statements if not query.startswith("SELECT")]
+
+
+def test_archive_partition_first_run(recording_cursor):
+    # archive still partitioned, partition has rows, archive empty
+    cursor = recording_cursor([[(3,)], [(1,)], []])
+    assert archive_partition(cursor, "p2024_12") == "subscriber_snapshots_archive_2024_12"
+    assert _statements(cursor) == [
+        "CREATE TABLE IF NOT EXISTS subscriber_snapshots_archive_2024_12 LIKE subscriber_snapshots",
+        "ALTER TABLE subscriber_snapshots_archive_2024_12 REMOVE PARTITIONING",
+        "ALTER TABLE subscriber_snapshots EXCHANGE PARTITION p2024_12 "
+        "WITH TABLE subscriber_snapshots_archive_2024_12",
+        "ALTER TABLE subscriber_snapshots DROP PARTITION p2024_12",
+        "ALTER TABLE subscriber_snapshots_archive_2024_12 ROW_FORMAT=COMPRESSED",
+    ]
+
+
+def test_archive_partition_rerun_after_failed_drop(recording_cursor):
+    # archive already unpartitioned and holding the rows, partition now empty
+    cursor = recording_cursor([[(0,)], [], [(1,)]])
+    archive_partition(cursor, "p2024_12")
+    assert _statements(cursor) == [
+        "CREATE TABLE IF NOT EXISTS subscriber_snapshots_archive_2024_12 LIKE subscriber_snapshots",
+        "ALTER TABLE subscriber_snapshots DROP PARTITION p2024_12",
+        "ALTER TABLE subscriber_snapshots_archive_2024_12 ROW_FORMAT=COMPRESSED",
+    ]
+
+
+def test_archive_partition_refuses_to_swap_rows_back(recording_cursor):
+    cursor = recording_cursor([[(0,)], [(1,)], [(1,)]])
+    with pytest.raises(RuntimeError):
+        archive_partition(cursor, "p2024_12")
+    assert not any("EXCHANGE" in query or "DROP" in query for query in _statements(cursor))
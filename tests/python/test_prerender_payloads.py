@@ -0,0 +1,55 @@
+"""Tests for scripts/prerender_payloads.py"""
+
+from datetime import date
+
+from prerender_payloads import (
+    PAYLOAD_VERSION,
+    is_fresh,
+    load_manifest,
+    prune_payloads,
+    read_payload,
+    write_payloads,
+)
+
+
+def test_manifest_is_fresh_until_next_import(tmp_path, recording_cursor):
+    write_payloads({"overview": {"totals": {}}}, date(2026, 10, 12), 41, str(tmp_path))
+    manifest = load_manifest(str(tmp_path))
+
+    assert is_fresh(manifest, recording_cursor([[(41,)]]))
+    assert not is_fresh(manifest, recording_cursor([[(42,)]]))
+    assert not is_fresh(manifest, recording_cursor([[(None,)]]))
+
+
+def test_manifest_from_other_version_is_stale(recording_cursor):
+    manifest = {"version": PAYLOAD_VERSION + 1, "import_id": 41}
+    assert not is_fresh(manifest, recording_cursor([[(41,)]]))
+    assert not is_fresh(None, recording_cursor([[(41,)]]))
+
+
+def test_read_payload_returns_data_only_when_fresh(tmp_path, recording_cursor):
+    write_payloads(
+        {"overview": {"totals": {"total_active": 7}}}, date(2026, 10, 12), 41, str(tmp_path)
+    )
+
+    fresh = read_payload(recording_cursor([[(41,)]]), "overview", str(tmp_path))
+    assert fresh == {"totals": {"total_active": 7}}
+    assert read_payload(recording_cursor([[(42,)]]), "overview", str(tmp_path)) is None
+    assert read_payload(recording_cursor([[(41,)]]), "paper_cards", str(tmp_path)) is None
+
+
+def test_missing_manifest_loads_as_none(tmp_path):
+    assert load_manifest(str(tmp_path)) is None
+
+
+def test_prune_keeps_latest_snapshots(tmp_path):
+    for day in range(1, 6):
+        (tmp_path / f"2026-10-0{day}").mkdir()
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "manifest.json").write_text("{}")
+
+    removed = prune_payloads(str(tmp_path), keep=2, current="2026-10-01")
+
+    assert removed == ["2026-10-03", "2026-10-02"]
+    remaining = sorted(p.name for p in tmp_path.iterdir())
+    assert remaining == ["2026-10-01", "2026-10-04", "2026-10-05", "manifest.json", "notes"]
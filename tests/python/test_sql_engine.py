@@ -0,0 +1,120 @@
+"""Tests for scripts/sql_engine.py"""
+
+import re
+
+import pytest
+
+from sql_engine import VACATION_DATE_PATTERN, compare_results, create_staging_tables, load_csv
+
+
+def _stats(**overrides):
+    stats = {
+        "total_active": 10,
+        "on_vacation": 1,
+        "deliverable": 9,
+        "mail_delivery": 2,
+        "carrier_delivery": 7,
+        "digital_only": 1,
+        "duplicates_resolved": 0,
+        "top_rates": [("101", "Standard", 6), ("102", "Senior", 4)],
+    }
+    stats.update(overrides)
+    return stats
+
+
+def test_compare_results_identical():
+    assert compare_results({"TJ": _stats()}, {"TJ": _stats()}) == []
+
+
+def test_compare_results_reports_stat_and_missing_papers():
+    differences = compare_results(
+        {"TJ": _stats(), "TA": _stats()}, {"TJ": _stats(on_vacation=2), "TR": _stats()}
+    )
+    assert differences == [
+        "TA: missing from SQL engine",
+        "TJ.on_vacation: python=1 sql=2",
+        "TR: missing from Python engine",
+    ]
+
+
+def test_compare_results_checks_top_rates():
+    swapped = _stats(top_rates=[("102", "Senior", 4), ("101", "Standard", 6)])
+    differences = compare_results({"TJ": _stats()}, {"TJ": swapped})
+    assert len(differences) == 1
+    assert differences[0].startswith("TJ.top_rates:")
+
+
+def _load(tmp_path, recording_cursor, content, table, optional_columns=None):
+    path = tmp_path / "export.csv"
+    path.write_bytes(content.encode())
+    cursor = recording_cursor()
+    load_csv(cursor, str(path), table, optional_columns)
+    return cursor.statements[0][0]
+
+
+def test_load_csv_maps_columns_by_header_position(tmp_path, recording_cursor):
+    query = _load(
+        tmp_path,
+        recording_cursor,
+        "sp_route,extra,sp_num,sp_vac_ind,sp_rate_id,sp_stat,ad_phone,sp_phone\n",
+        "stg_subscriptions",
+        {"phone": ("sp_phone", "ad_phone", "Phone")},
+    )
+    assert "(@c0, @c1, @c2, @c3, @c4, @c5, @c6, @c7)" in query
+    assert "sp_num = TRIM(@c2)" in query
+    assert "sp_stat = TRIM(@c5)" in query
+    assert "sp_rate_id = TRIM(@c4)" in query
+    assert "sp_route = TRIM(@c0)" in query
+    assert "sp_vac_ind = TRIM(@c3)" in query
+    # Candidates in preference order, not file order
+    assert "phone = COALESCE(NULLIF(TRIM(@c7), ''), NULLIF(TRIM(@c6), ''), '')" in query
+    assert "ESCAPED BY ''" in query
+    assert "LINES TERMINATED BY '\\n'" in query
+
+
+def test_load_csv_detects_crlf_exports(tmp_path, recording_cursor):
+    query = _load(
+        tmp_path, recording_cursor, "rr_code,rr_edition,rr_desc\r\n1,TJ,x\r\n", "stg_rates"
+    )
+    assert "LINES TERMINATED BY '\\r\\n'" in query
+
+
+def test_load_csv_rejects_missing_columns(tmp_path, recording_cursor):
+    with pytest.raises(ValueError, match="rr_edition"):
+        _load(tmp_path, recording_cursor, "rr_code,rr_desc\n", "stg_rates")
+
+
+@pytest.mark.parametrize(
+    "value, valid",
+    [
+        ("1/5/26", True),
+        ("12/31/99", True),
+        ("02/30/26", True),  # shape is valid; the day is checked against LAST_DAY in SQL
+        ("13/01/26", False),
+        ("00/10/26", False),
+        ("01/32/26", False),
+        ("13/45/26", False),
+        ("1/5/2026", False),
+        ("2026-01-05", False),
+    ],
+)
+def test_vacation_date_pattern(value, valid):
+    assert bool(re.match(VACATION_DATE_PATTERN, value)) is valid
+
+
+def test_staging_key_columns_compare_exactly(recording_cursor):
+    cursor = recording_cursor()
+    create_staging_tables(cursor, {"TJ": "The Journal"}, {"TJ": "Wyoming"})
+    ddl = " ".join(q for q, _ in cursor.statements if q.startswith("CREATE"))
+    for column in (
+        "rr_code VARCHAR(50)",
+        "rr_edition VARCHAR(10)",
+        "vd_sp_id VARCHAR(50)",
+        "sp_num VARCHAR(50)",
+        "sp_stat VARCHAR(5)",
+        "sp_rate_id VARCHAR(50)",
+        "sp_route VARCHAR(100)",
+        "sp_vac_ind VARCHAR(50)",
+        "paper_code VARCHAR(10)",
+    ):
+        assert f"{column} COLLATE utf8mb4_bin" in ddl
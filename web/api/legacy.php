@@ -9,6 +9,10 @@
 
 // Require authentication
 require_once 'auth_check.php';
+require_once __DIR__ . '/../lib/PayloadReader.php';
+
+use CirculationDashboard\PayloadReader;
+
 // Error reporting (disable in production)
 error_reporting(E_ALL);
 ini_set('display_errors', 0);
@@ -3117,6 +3121,22 @@ try {
             sendResponse($data);
             break;
 
+        case 'payload':
+            // Pre-rendered by scripts/prerender_payloads.py after each import.
+            // 404 means stale or missing: the caller falls back to the live action.
+            $name = $_GET['name'] ?? '';
+            if (!in_array($name, PayloadReader::PAYLOAD_NAMES, true)) {
+                sendError('Invalid payload: ' . $name);
+                break;
+            }
+            $data = (new PayloadReader($pdo))->read($name);
+            if ($data === null) {
+                sendError('Payload not available: ' . $name, 404);
+                break;
+            }
+            sendResponse($data);
+            break;
+
         default:
                                                                                                                                                                                                                                                                  sendError('Invalid action: ' . $action);
 
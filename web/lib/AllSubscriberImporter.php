@@ -9,6 +9,7 @@
  * Core Processing Logic:
  * - Parse Newzware CSV format (header detection, decorative row skipping)
  * - Extract snapshot date from filename (YYYYMMDDHHMMSS format)
+ * - Resolve duplicate subscribers (same SUB NUM and Ed) before anything is counted
  * - Soft backfill algorithm (fill missing weeks backward until hitting existing data)
  * - Insert/update daily_snapshots and subscriber_snapshots tables
  * - Transaction safety with rollback on errors
@@ -59,7 +60,7 @@ class AllSubscriberImporter
      *
      * @param string $filepath Path to CSV file
      * @param string $filename Original filename
-     * @return array{date_range: string, new_records: int, updated_records: int, total_processed: int, summary_html: string}
+     * @return array{date_range: string, new_records: int, updated_records: int, total_processed: int, duplicates_resolved: int, summary_html: string}
      * @throws Exception on validation or processing errors
      */
     public function import(string $filepath, string $filename): array
@@ -179,13 +180,13 @@ class AllSubscriberImporter
         }
 
         // Tracking variables
-        $snapshots = [];
-        $subscriber_records = [];
+        $subscriber_records = [];  // "sub_num|paper_code" => surviving record
         $stats = [
             'new_records' => 0,
             'updated_records' => 0,
             'total_processed' => 0,
             'subscriber_records_imported' => 0,
+            'duplicates_resolved' => 0,
             'min_date' => null,
             'max_date' => null,
             'by_business_unit' => []
@@ -282,59 +283,10 @@ class AllSubscriberImporter
                 $business_unit = $paper_info['business_unit'];
                 $paper_name = $paper_info['name'];
 
-                // Initialize snapshot for this week/paper if not exists
-                $key = $week_num . '|' . $year . '|' . $paper_code;
-                if (!isset($snapshots[$key])) {
-                    $snapshots[$key] = [
-                        'snapshot_date' => $snapshot_date,
-                        'week_num' => $week_num,
-                        'year' => $year,
-                        'paper_code' => $paper_code,
-                        'paper_name' => $paper_name,
-                        'business_unit' => $business_unit,
-                        'total_active' => 0,
-                        'mail_delivery' => 0,
-                        'carrier_delivery' => 0,
-                        'digital_only' => 0,
-                        'comp_count' => 0,
-                        'on_vacation' => 0
-                    ];
-                }
-
-                // Count subscribers
-                $snapshots[$key]['total_active']++;
-
-                // Count complimentary (non-paying) subscribers
-                if (strtoupper($payment_status) === 'COMP') {
-                    $snapshots[$key]['comp_count']++;
-                }
-
-                // Count by delivery type
-                switch (strtoupper($delivery_type)) {
-                    case 'MAIL':
-                        $snapshots[$key]['mail_delivery']++;
-                        break;
-                    case 'CARR':
-                    case 'CARRIER':
-                        $snapshots[$key]['carrier_delivery']++;
-                        break;
-                    case 'INTE':
-                    case 'INTERNET':
-                    case 'DIGITAL':
-                    case 'EMAI':
-                    case 'EMAIL':
-                        $snapshots[$key]['digital_only']++;
-                        break;
-                }
-
-                // Count vacations
+                // Vacation holds are flagged in the zone column
                 $on_vacation = (stripos($zone, 'VAC') !== false || stripos($zone, 'VACATION') !== false);
-                if ($on_vacation) {
-                    $snapshots[$key]['on_vacation']++;
-                }
 
-                // Store individual subscriber record
-                $subscriber_records[] = [
+                $record = [
                     'snapshot_date' => $snapshot_date,
                     'week_num' => $week_num,
                     'year' => $year,
@@ -363,6 +315,10 @@ class AllSubscriberImporter
                     'login_id' => $login_id,
                     'last_login' => $this->parseDate($last_login)
                 ];
+
+                if (self::addSubscriberRecord($subscriber_records, $record)) {
+                    $stats['duplicates_resolved']++;
+                }
             } catch (Exception $e) {
                 error_log("Row $row_num error: " . $e->getMessage());
             }
@@ -370,6 +326,14 @@ class AllSubscriberImporter
 
         fclose($handle);
 
+        if ($stats['duplicates_resolved'] > 0) {
+            $debug("Resolved {$stats['duplicates_resolved']} duplicate subscriber rows");
+        }
+
+        // Aggregate weekly snapshots from the de-duplicated subscribers
+        $snapshots = self::buildWeeklySnapshots($subscriber_records);
+        $subscriber_records = array_values($subscriber_records);
+
         if (empty($snapshots)) {
             throw new Exception('No valid data found in CSV file (or all data is before 2025-01-01)');
         }
@@ -591,6 +555,17 @@ class AllSubscriberImporter
 
             error_log("✅ SoftBackfill complete: $total_weeks_processed weeks processed ($total_real real, $total_backfilled backfilled)");
 
+            // Logged in the same transaction: a new import_log id is what marks
+            // the pre-rendered dashboard payloads (PayloadReader) as stale
+            $log_stmt = $this->pdo->prepare("
+                INSERT INTO import_log (file_type, file_name, records_processed, status)
+                VALUES ('all_subscriber', :file_name, :records_processed, 'success')
+            ");
+            $log_stmt->execute([
+                'file_name' => $filename,
+                'records_processed' => $stats['subscriber_records_imported']
+            ]);
+
             $this->pdo->commit();
 
             // Update raw_uploads with final metadata
@@ -643,12 +618,16 @@ class AllSubscriberImporter
             $summary_html .= "<span class='text-gray-600 text-xs'>Papers: $papers ({$data['count']} snapshots)</span>";
             $summary_html .= "</div>";
         }
+        if ($stats['duplicates_resolved'] > 0) {
+            $summary_html .= "<div class='text-gray-600 text-xs'>Resolved {$stats['duplicates_resolved']} duplicate subscriber rows</div>";
+        }
 
         return [
             'date_range' => $stats['min_date'] . ' to ' . $stats['max_date'],
             'new_records' => $stats['new_records'],
             'updated_records' => $stats['updated_records'],
             'total_processed' => $stats['total_processed'],
+            'duplicates_resolved' => $stats['duplicates_resolved'],
             'summary_html' => $summary_html
         ];
     }
@@ -764,6 +743,109 @@ class AllSubscriberImporter
         return (strlen($digits) === 10) ? $digits : null;
     }
 
+    /**
+     * Add a parsed row to the (sub_num, paper_code) index, resolving duplicates
+     *
+     * The row with the most complete contact info wins, ties go to the later
+     * row - same rule as sql/06_fix_duplicate_subscribers.sql and
+     * scripts/import_to_database.py.
+     *
+     * @param array<string, array> $records "sub_num|paper_code" => surviving record
+     * @param array $record Parsed subscriber record
+     * @return bool True if the row duplicated one already indexed
+     */
+    public static function addSubscriberRecord(array &$records, array $record): bool
+    {
+        $index_key = $record['sub_num'] . '|' . $record['paper_code'];
+        if (!isset($records[$index_key])) {
+            $records[$index_key] = $record;
+            return false;
+        }
+        if (self::contactCompleteness($record) >= self::contactCompleteness($records[$index_key])) {
+            $records[$index_key] = $record;
+        }
+        return true;
+    }
+
+    /**
+     * Count de-duplicated subscribers into one snapshot per week and paper
+     *
+     * @param array<array> $subscriber_records Surviving subscriber records
+     * @return array<string, array> "week_num|year|paper_code" => snapshot counts
+     */
+    public static function buildWeeklySnapshots(array $subscriber_records): array
+    {
+        $snapshots = [];
+        foreach ($subscriber_records as $sub) {
+            // Initialize snapshot for this week/paper if not exists
+            $key = $sub['week_num'] . '|' . $sub['year'] . '|' . $sub['paper_code'];
+            if (!isset($snapshots[$key])) {
+                $snapshots[$key] = [
+                    'snapshot_date' => $sub['snapshot_date'],
+                    'week_num' => $sub['week_num'],
+                    'year' => $sub['year'],
+                    'paper_code' => $sub['paper_code'],
+                    'paper_name' => $sub['paper_name'],
+                    'business_unit' => $sub['business_unit'],
+                    'total_active' => 0,
+                    'mail_delivery' => 0,
+                    'carrier_delivery' => 0,
+                    'digital_only' => 0,
+                    'comp_count' => 0,
+                    'on_vacation' => 0
+                ];
+            }
+
+            // Count subscribers
+            $snapshots[$key]['total_active']++;
+
+            // Count complimentary (non-paying) subscribers
+            if (strtoupper($sub['payment_status']) === 'COMP') {
+                $snapshots[$key]['comp_count']++;
+            }
+
+            // Count by delivery type
+            switch (strtoupper($sub['delivery_type'])) {
+                case 'MAIL':
+                    $snapshots[$key]['mail_delivery']++;
+                    break;
+                case 'CARR':
+                case 'CARRIER':
+                    $snapshots[$key]['carrier_delivery']++;
+                    break;
+                case 'INTE':
+                case 'INTERNET':
+                case 'DIGITAL':
+                case 'EMAI':
+                case 'EMAIL':
+                    $snapshots[$key]['digital_only']++;
+                    break;
+            }
+
+            // Count vacations
+            if ($sub['on_vacation']) {
+                $snapshots[$key]['on_vacation']++;
+            }
+        }
+
+        return $snapshots;
+    }
+
+    /**
+     * Count of non-empty contact fields (phone, email, address)
+     *
+     * Decides which row survives when a subscriber appears more than once.
+     *
+     * @param array $record Subscriber record
+     * @return int 0-3
+     */
+    private static function contactCompleteness(array $record): int
+    {
+        return ($record['phone'] !== '' ? 1 : 0)
+            + ($record['email'] !== '' ? 1 : 0)
+            + ($record['address'] !== '' ? 1 : 0);
+    }
+
     /**
      * Get ISO week number and year from date
      *
@@ -0,0 +1,121 @@
+<?php
+
+/**
+ * Pre-rendered Payload Reader
+ *
+ * Serves the dashboard payloads written by scripts/prerender_payloads.py
+ * without touching daily_snapshots.
+ *
+ * Layout (under the payload directory):
+ * - manifest.json: version, snapshot_date, import_id, files
+ * - <snapshot_date>/<name>.v<version>.json.gz: {version, ..., data}
+ *
+ * Freshness:
+ * - The manifest records the import_log id it was built from
+ * - Every import path (Python importer, AllSubscriberImporter,
+ *   VacationImporter, upload_vacations.php) inserts an import_log row
+ * - Payloads are served only while MAX(import_log.id) still matches;
+ *   otherwise read() returns null and the caller queries live
+ *
+ * Mirrors is_fresh() / read_payload() in scripts/prerender_payloads.py.
+ *
+ * Date: 2026-10-18
+ */
+
+namespace CirculationDashboard;
+
+use PDO;
+
+class PayloadReader
+{
+    /** Must match PAYLOAD_VERSION in scripts/prerender_payloads.py */
+    public const PAYLOAD_VERSION = 1;
+
+    /** Must match PAYLOAD_DIR in scripts/prerender_payloads.py */
+    public const DEFAULT_DIR = '/volume1/circulation/cache/payloads';
+
+    /** @var array<string> Payload names the pre-renderer writes */
+    public const PAYLOAD_NAMES = ['overview', 'business_unit_trends', 'paper_cards'];
+
+    /** @var PDO Database connection */
+    private PDO $pdo;
+
+    /** @var string Payload directory */
+    private string $payloadDir;
+
+    /**
+     * Constructor
+     *
+     * @param PDO $pdo Database connection
+     * @param string $payloadDir Payload directory
+     */
+    public function __construct(PDO $pdo, string $payloadDir = self::DEFAULT_DIR)
+    {
+        $this->pdo = $pdo;
+        $this->payloadDir = rtrim($payloadDir, '/');
+    }
+
+    /**
+     * Current manifest, or null if it is missing or unreadable
+     *
+     * @return array<string, mixed>|null
+     */
+    public function loadManifest(): ?array
+    {
+        $path = $this->payloadDir . '/manifest.json';
+        if (!is_file($path)) {
+            return null;
+        }
+        $manifest = json_decode((string)file_get_contents($path), true);
+        return is_array($manifest) ? $manifest : null;
+    }
+
+    /**
+     * True if the manifest was built from the latest logged import
+     *
+     * @param array<string, mixed>|null $manifest
+     */
+    public function isFresh(?array $manifest): bool
+    {
+        if ($manifest === null || ($manifest['version'] ?? null) !== self::PAYLOAD_VERSION) {
+            return false;
+        }
+        $latest = $this->pdo->query("SELECT MAX(id) FROM import_log")->fetchColumn();
+        return $latest !== null && $latest !== false
+            && (int)$latest === (int)($manifest['import_id'] ?? 0);
+    }
+
+    /**
+     * Payload data for $name if the pre-rendered files are fresh
+     *
+     * @param string $name Payload name (see PAYLOAD_NAMES)
+     * @return mixed|null Decoded payload data, or null to fall back to live queries
+     */
+    public function read(string $name): mixed
+    {
+        $manifest = $this->loadManifest();
+        if (!$this->isFresh($manifest)) {
+            return null;
+        }
+
+        // Only follow manifest entries shaped like the files the pre-renderer writes
+        $file = $manifest['files'][$name] ?? null;
+        if (!is_string($file) || !preg_match('#^\d{4}-\d{2}-\d{2}/[a-z_]+\.v\d+\.json\.gz$#', $file)) {
+            return null;
+        }
+
+        $path = $this->payloadDir . '/' . $file;
+        if (!is_file($path)) {
+            return null;
+        }
+        $json = @gzdecode((string)file_get_contents($path));
+        if ($json === false) {
+            return null;
+        }
+        $document = json_decode($json, true);
+        if (!is_array($document) || !array_key_exists('data', $document)) {
+            return null;
+        }
+        return $document['data'];
+    }
+}
@@ -67,7 +67,10 @@ class VacationImporter
             // Step 3: Update raw_uploads with final metadata
             $this->updateRawUploadSuccess($uploadId, $stats);
 
-            // Step 4: Build summary for response
+            // Step 4: Log the import so pre-rendered dashboard payloads are marked stale
+            $this->logImport($filename, $stats['updated_rows']);
+
+            // Step 5: Build summary for response
             $summary = $this->buildSummaryHTML($stats);
 
             return [
@@ -84,6 +87,27 @@ class VacationImporter
         }
     }
 
+    /**
+     * Record the import in import_log
+     *
+     * A new import_log id is what PayloadReader uses to decide that the
+     * pre-rendered dashboard payloads no longer match daily_snapshots.
+     *
+     * @param string $filename Original filename
+     * @param int $recordsProcessed Subscriber rows updated
+     */
+    private function logImport(string $filename, int $recordsProcessed): void
+    {
+        $stmt = $this->pdo->prepare("
+            INSERT INTO import_log (file_type, file_name, records_processed, status)
+            VALUES ('vacation', :file_name, :records_processed, 'success')
+        ");
+        $stmt->execute([
+            'file_name' => $filename,
+            'records_processed' => $recordsProcessed
+        ]);
+    }
+
     /**
      * Save raw CSV to raw_uploads table
      *
@@ -237,6 +237,16 @@ try {
     ");
     $updateDaily->execute();
     $stats['daily_snapshots_updated'] = $updateDaily->rowCount();
+
+    // Log the import so pre-rendered dashboard payloads are marked stale
+    $logStmt = $db->prepare("
+        INSERT INTO import_log (file_type, file_name, records_processed, status)
+        VALUES ('vacation', :file_name, :records_processed, 'success')
+    ");
+    $logStmt->execute([
+        'file_name' => $filename,
+        'records_processed' => $stats['updated_rows']
+    ]);
 // Step 3: Update raw_uploads with final metadata
     $latestSnapshotStmt = $db->query("SELECT MAX(snapshot_date) as max_date FROM subscriber_snapshots");
     $latestSnapshot = $latestSnapshotStmt->fetch();